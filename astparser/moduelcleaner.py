@@ -1,4 +1,5 @@
 from dataclasses import replace
+from typing import TypeVar
 
 from astparser import get_base_type_name, Type, get_base_type, FunctionType, InlineDeclaration
 from astparser.model import Module, Struct, Enum, TypeDefinition, Union, Container
@@ -8,45 +9,62 @@ class ModuleCleaner:
     externally_known_type_name: list[str] = []
 
     def remove_not_used_elements(self, module: Module) -> Module:
-        needed_type_names: set[str] = set[str]()
-        known_type_names: set[str] = set[str]()
+        containers_by_name = self._index_by_name(module.container)
+        enums_by_name = self._index_by_name(module.enums)
+        type_definitions_by_name = self._index_by_name(module.type_definitions)
+        externally_known_type_names = set(self.externally_known_type_name)
 
         containers: list[Container] = []
         enums: list[Enum] = []
         type_definitions: list[TypeDefinition] = []
 
         types = self._get_field_types(module) + self._get_method_types(module)
-        base_types = self._get_list_of_base_type_names(types)
-        needed_type_names = needed_type_names.union(base_types)
-        previous_needed_type_names: set[str] = set[str]()
+        needed_type_names: set[str] = set(self._get_list_of_base_type_names(types))
+        known_type_names: set[str] = set[str]()
 
+        # Every round handles the names referenced by the elements found in the previous round,
+        # so each element is visited exactly once and the output keeps the order of the rounds.
         while len(needed_type_names) > 0:
-            if needed_type_names == previous_needed_type_names:
-                raise Exception("Loop detected while cleaning up module")
-            previous_needed_type_names = needed_type_names.copy()
-
-            new_container = self._find_needed_container(module.container, needed_type_names)
-            new_enums = self._find_needed_enums(module.enums, needed_type_names)
-            new_type_definitions = self._find_needed_type_definitions(module.type_definitions, needed_type_names)
+            new_container = self._find_needed(containers_by_name, needed_type_names)
+            new_enums = self._find_needed(enums_by_name, needed_type_names)
+            new_type_definitions = self._find_needed(type_definitions_by_name, needed_type_names)
 
             containers.extend(new_container)
             enums.extend(new_enums)
             type_definitions.extend(new_type_definitions)
 
             found_names = self._get_name_of_elements(new_container, new_enums, new_type_definitions)
-            known_type_names = known_type_names.union(found_names)
+            known_type_names.update(found_names)
 
-            referenced_names = self._get_referenced_type_names(new_container, new_type_definitions)
-            left_needed_type_names = needed_type_names.difference(found_names)
+            missing_type_names = needed_type_names.difference(found_names).difference(externally_known_type_names)
+            if len(missing_type_names) > 0:
+                raise Exception("Loop detected while cleaning up module")
 
-            needed_type_names = left_needed_type_names.union(referenced_names).difference(known_type_names)
-            needed_type_names = needed_type_names.difference(self.externally_known_type_name)
+            referenced_names = self._get_referenced_type_names(new_container, new_type_definitions)
+            needed_type_names = referenced_names.difference(known_type_names)
+            needed_type_names = needed_type_names.difference(externally_known_type_names)
 
         return replace(module,
                        container=containers,
                        enums=enums,
                        type_definitions=type_definitions)
 
+    T = TypeVar('T', Container, Enum, TypeDefinition)
+
+    @staticmethod
+    def _index_by_name(elements: list[T]) -> dict[str, list[tuple[int, T]]]:
+        elements_by_name: dict[str, list[tuple[int, ModuleCleaner.T]]] = {}
+        for index, element in enumerate(elements):
+            elements_by_name.setdefault(element.name, []).append((index, element))
+        return elements_by_name
+
+    @staticmethod
+    def _find_needed(elements_by_name: dict[str, list[tuple[int, T]]], needed_type_names: set[str]) -> list[T]:
+        found = [entry
+                 for name in needed_type_names
+                 for entry in elements_by_name.get(name, [])]
+        return [element for index, element in sorted(found, key=lambda it: it[0])]
+
     @staticmethod
     def _get_name_of_elements(
             containers: list[Container],
@@ -84,22 +102,6 @@ class ModuleCleaner:
                 for function_type in function_types
                 for param in function_type.params]
 
-    @staticmethod
-    def _find_needed_container(all_container: list[Container], needed_type_names: set[str]) -> list[Container]:
-        return [container for container in all_container if container.name in needed_type_names]
-
-    @staticmethod
-    def _find_needed_enums(all_enums: list[Enum], needed_type_names: set[str]) -> list[Enum]:
-        return [enum for enum in all_enums if enum.name in needed_type_names]
-
-    @staticmethod
-    def _find_needed_type_definitions(
-            all_type_definitions: list[TypeDefinition],
-            needed_type_names: set[str]
-    ) -> list[TypeDefinition]:
-        return [type_definition
-                for type_definition in all_type_definitions if type_definition.name in needed_type_names]
-
     @staticmethod
     def _get_referenced_types_of_union(union: Union) -> list[Type]:
         return [property.type for property in union.properties]
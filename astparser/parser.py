@@ -1,6 +1,7 @@
 import os
 import sys
 from dataclasses import replace
+from functools import lru_cache
 from typing import Callable, Any
 
 from pycparser import parse_file, c_ast
@@ -35,62 +36,115 @@ def _parse_array_dimension(array_dimension: Node) -> int:
     return array_dimension.value
 
 
-def _parse_type(node: Node) -> Type:
-    if isinstance(node, TypeDecl):
-        parsed_type = _parse_type(node.type)
-        if isinstance(parsed_type, NamedType):
-            parsed_type = NamedType(name=parsed_type.name, constant=_is_constant(node))
-        elif isinstance(parsed_type, InlineDeclaration):
-            inline_declaration_name = parsed_type.name
-            if inline_declaration_name is None:
-                inline_declaration_name = node.declname
-            parsed_type = replace(parsed_type, name=inline_declaration_name, constant=_is_constant(node))
-        return parsed_type
-    elif isinstance(node, IdentifierType):
-        name = _identifier_names_to_str(node.names)
-        return NamedType(name=name, constant=False)
-    elif isinstance(node, PtrDecl):
-        parsed_type = _parse_type(node.type)
-        return Pointer(of=parsed_type, constant=_is_constant(node))
-    elif isinstance(node, ArrayDecl):
-        parsed_type = _parse_type(node.type)
-        return Array(of=parsed_type, size=_parse_array_dimension(node.dim), constant=False)
-    elif isinstance(node, c_ast.Struct):
-        return InlineStructType(name=node.name, constant=False)
-    elif isinstance(node, c_ast.Union):
-        return InlineUnionType(name=node.name, constant=False)
-    elif isinstance(node, c_ast.FuncDecl):
-        params: list[FunctionParameter] = []
-        if not isinstance(node.args, ParamList):
-            raise Exception(f"Unexpected type for function arguments {type(node.args)}")
-        for parameter in node.args.params:
-            if isinstance(parameter, Typename) or isinstance(parameter, Decl):
-                params.append(FunctionParameter(name=parameter.name, type=_parse_type(parameter.type)))
-            else:
-                raise Exception(f"Unexpected type for parameter in parameter list {parameter}")
+@lru_cache(maxsize=4096)
+def _named_type(name: str, constant: bool) -> NamedType:
+    # NamedTypes are immutable, so the same instance can be shared by every declaration using the type. The cache is
+    # bounded, as it is shared by every header parsed in the process.
+    return NamedType(name=name, constant=constant)
 
-        return FunctionType(
-            params=params,
-            return_type=_parse_type(node.type),
-            constant=False
-        )
-    else:
+
+def _parse_identifier_type(node: IdentifierType) -> Type:
+    return _named_type(_identifier_names_to_str(node.names), False)
+
+
+def _parse_struct_type(node: c_ast.Struct) -> Type:
+    return InlineStructType(name=node.name, constant=False)
+
+
+def _parse_union_type(node: c_ast.Union) -> Type:
+    return InlineUnionType(name=node.name, constant=False)
+
+
+def _parse_function_type(node: FuncDecl) -> Type:
+    params: list[FunctionParameter] = []
+    if not isinstance(node.args, ParamList):
+        raise Exception(f"Unexpected type for function arguments {type(node.args)}")
+    for parameter in node.args.params:
+        if isinstance(parameter, Typename) or isinstance(parameter, Decl):
+            params.append(FunctionParameter(name=parameter.name, type=_parse_type(parameter.type)))
+        else:
+            raise Exception(f"Unexpected type for parameter in parameter list {parameter}")
+
+    return FunctionType(
+        params=params,
+        return_type=_parse_type(node.type),
+        constant=False
+    )
+
+
+def _apply_type_declaration(node: TypeDecl, parsed_type: Type) -> Type:
+    if isinstance(parsed_type, NamedType):
+        parsed_type = _named_type(parsed_type.name, _is_constant(node))
+    elif isinstance(parsed_type, InlineDeclaration):
+        inline_declaration_name = parsed_type.name
+        if inline_declaration_name is None:
+            inline_declaration_name = node.declname
+        parsed_type = replace(parsed_type, name=inline_declaration_name, constant=_is_constant(node))
+    return parsed_type
+
+
+def _apply_pointer_declaration(node: PtrDecl, parsed_type: Type) -> Type:
+    return Pointer(of=parsed_type, constant=_is_constant(node))
+
+
+def _apply_array_declaration(node: ArrayDecl, parsed_type: Type) -> Type:
+    return Array(of=parsed_type, size=_parse_array_dimension(node.dim), constant=False)
+
+
+_BASE_TYPE_PARSERS: dict[type, Callable[[Any], Type]] = {
+    IdentifierType: _parse_identifier_type,
+    c_ast.Struct: _parse_struct_type,
+    c_ast.Union: _parse_union_type,
+    FuncDecl: _parse_function_type
+}
+
+_DECLARATOR_PARSERS: dict[type, Callable[[Any, Type], Type]] = {
+    TypeDecl: _apply_type_declaration,
+    PtrDecl: _apply_pointer_declaration,
+    ArrayDecl: _apply_array_declaration
+}
+
+
+def _parse_type(node: Node) -> Type:
+    # Unwrap the declarators iteratively, so deeply nested pointers and arrays do not hit the recursion limit
+    declarators: list[Node] = []
+    while type(node) in _DECLARATOR_PARSERS:
+        declarators.append(node)
+        node = node.type
+
+    base_type_parser = _BASE_TYPE_PARSERS.get(type(node))
+    if base_type_parser is None:
         raise Exception(f"Unexpected type {type(node)}{node}")
+    parsed_type = base_type_parser(node)
+
+    for declarator in reversed(declarators):
+        parsed_type = _DECLARATOR_PARSERS[type(declarator)](declarator, parsed_type)
+    return parsed_type
+
 
 class _ContainerParser:
-    __container_types: dict[type, (type, type)] = {}
+    __container_types: dict[type, (type, type)]
+    __output_types_by_c_ast_type: dict[type, list[type]]
+
+    def __init__(self):
+        self.__container_types = {}
+        self.__output_types_by_c_ast_type = {}
 
     def register_container(self, typ: type, output_type:type, c_ast_type: type):
+        previous_entry = self.__container_types.get(typ)
+        if previous_entry is not None:
+            self.__output_types_by_c_ast_type[previous_entry[1]].remove(previous_entry[0])
         self.__container_types[typ] = (output_type, c_ast_type)
+        self.__output_types_by_c_ast_type.setdefault(c_ast_type, []).append(output_type)
 
     def can_parse_type(self, c_ast_type: type) -> bool:
         return len(self._find_output_types_for_input(c_ast_type)) > 0
 
     def _find_output_types_for_input(self, c_ast_type: type) -> list[type]:
-        return [tuple[0] for typ, tuple in self.__container_types.items() if tuple[1] == c_ast_type]
+        return self.__output_types_by_c_ast_type.get(c_ast_type, [])
 
     def _get_registered_c_ast_type(self, typ: type) -> Optional[type]:
-        entry = self.__container_types[typ]
+        entry = self.__container_types.get(typ)
         if entry is None:
             return None
         return entry[1]
@@ -142,13 +196,13 @@ class _ContainerParser:
             inner_containers=inner_containers
         )
 
-    def _find_ast_concept(self, node: Node, ast_type: type) -> Optional[Any]:
-        if isinstance(node, TypeDecl) or isinstance(node, ArrayDecl) or isinstance(node, PtrDecl):
-            return self._find_ast_concept(node.type, ast_type)
-        elif isinstance(node, ast_type):
+    @staticmethod
+    def _find_ast_concept(node: Node, ast_type: type) -> Optional[Any]:
+        while type(node) in _DECLARATOR_PARSERS:
+            node = node.type
+        if isinstance(node, ast_type):
             return node
-        else:
-            return None
+        return None
 
 class _EnumParser:
     @staticmethod
@@ -289,12 +343,20 @@ class AstParser:
         self._container_parser.register_container(InlineUnionType, Union, c_ast.Union)
 
     def parse(self, ast: FileAST) -> Module:
-        definitions = self._filter_by_file(ast, self.origin_file_filter)
-        # main_definitions = list(filter(lambda it: input_file == it.coord.file, definitions))
-        declarations = self._get_top_level_declarations(definitions)
-        unnamed_declarations = self._get_unnamed_top_level_declarations(declarations)
-        named_declarations = self._get_named_top_level_declarations(declarations)
-        typedefs = self._get_top_level_typedefs(definitions)
+        typedefs: list[Typedef] = []
+        unnamed_declarations: list[Decl] = []
+        named_declarations: list[Decl] = []
+        for node in ast.ext:
+            if self.origin_file_filter is not None and not self.origin_file_filter(node.coord.file):
+                continue
+            node_type = type(node)
+            if node_type is Typedef:
+                typedefs.append(node)
+            elif node_type is Decl:
+                if node.name is None:
+                    unnamed_declarations.append(node)
+                else:
+                    named_declarations.append(node)
 
         containers = self._parse_unnamed_top_level_declarations(unnamed_declarations)
         ast_elements = _TypdefParser(self._container_parser).parse_typedefs(typedefs)
@@ -308,10 +370,6 @@ class AstParser:
             methods=ast_interface.methods
         )
 
-    @staticmethod
-    def _filter_by_file(ast: FileAST, origin_file_filter: Optional[Callable[[str], bool]]) -> list[Node]:
-        return list(filter(lambda it: origin_file_filter(it.coord.file), ast.ext))
-
     def _parse_named_top_level_declarations(self, declarations: list[Decl]) -> _AstInterface:
         fields: list[Field] = []
         methods: list[Method] = []
@@ -375,22 +433,6 @@ class AstParser:
                 raise Exception(f"Unexpected type {declaration.type}")
         return self._container_parser.parse_multiple(c_ast_containers)
 
-    @staticmethod
-    def _get_unnamed_top_level_declarations(declarations: list[Decl]) -> list[Decl]:
-        return [decl for decl in declarations if decl.name is None]
-
-    @staticmethod
-    def _get_named_top_level_declarations(declarations: list[Decl]) -> list[Decl]:
-        return [decl for decl in declarations if decl.name is not None]
-
-    @staticmethod
-    def _get_top_level_declarations(nodes: list[Node]) -> list[Decl]:
-        return [node for node in nodes if isinstance(node, Decl)]
-
-    @staticmethod
-    def _get_top_level_typedefs(nodes: list[Node]) -> list[Typedef]:
-        return [node for node in nodes if isinstance(node, Typedef)]
-
 
 if __name__ == '__main__':
     input_file = os.path.expanduser(sys.argv[1])
@@ -0,0 +1,227 @@
+import argparse
+import os.path
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from astparser.model import Module
+from bindinggenerator.model import BindingFile
+from bindinggenerator.sharedgenerator import SharedBindingFileGenerator
+from bindinggenerator.multirate import read_sample_time_ratios
+from bindinggenerator.systemgenerator import SystemGenerator
+from bindinggenerator.writer import CtypesMapper, SystemWriter, PythonBindingWriter, BufferedFileOutput
+from main import PathAction, dir_path, generate_bindings, parse_header
+
+
+@dataclass(frozen=True)
+class ModelHeader:
+    name: str
+    header: str
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    model: ModelHeader
+    output_path: str
+    duration: float
+    error: Optional[str]
+
+
+@dataclass(frozen=True)
+class _ParseResult:
+    model: ModelHeader
+    module: Optional[Module]
+    duration: float
+    error: Optional[str]
+
+
+_LIFE_CYCLE_METHOD_PATTERNS = ["{0}_initialize", "{0}_step[0-9]*"]
+_SHARED_BINDINGS_NAME = "shared_bindings"
+
+
+def _is_model_header(header: Path) -> bool:
+    try:
+        content = header.read_text(errors="ignore")
+    except OSError:
+        return False
+    name = re.escape(header.stem)
+    return all(re.search(r"\b" + pattern.format(name) + r"\s*\(", content) is not None
+               for pattern in _LIFE_CYCLE_METHOD_PATTERNS)
+
+
+def find_model_headers(path: str) -> list[ModelHeader]:
+    headers = sorted(Path(os.path.expanduser(path)).rglob("*.h"))
+    return [ModelHeader(name=header.stem, header=str(header)) for header in headers if _is_model_header(header)]
+
+
+def _bindings_name(model_name: str) -> str:
+    return model_name[:1].upper() + model_name[1:]
+
+
+def _generate(model: ModelHeader, output_path: str) -> BatchResult:
+    start = time.perf_counter()
+    error = None
+    try:
+        os.makedirs(output_path, exist_ok=True)
+        generate_bindings(model.header, output_path, _bindings_name(model.name), model.name)
+    except Exception:
+        error = traceback.format_exc()
+    return BatchResult(model=model, output_path=output_path, duration=time.perf_counter() - start, error=error)
+
+
+def generate_all_bindings(models: list[ModelHeader], output_path: str, jobs: Optional[int] = None) -> list[BatchResult]:
+    results: list[BatchResult] = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_generate, model, os.path.join(output_path, model.name)) for model in models]
+        for future in as_completed(futures):
+            result = future.result()
+            status = "ok" if result.error is None else "FAILED"
+            print(f"[{status}] {result.model.name} ({result.duration:.2f}s)")
+            results.append(result)
+    return sorted(results, key=lambda it: it.model.name)
+
+
+def _parse(model: ModelHeader) -> _ParseResult:
+    start = time.perf_counter()
+    module = None
+    error = None
+    try:
+        module = parse_header(model.header)
+    except Exception:
+        error = traceback.format_exc()
+    return _ParseResult(model=model, module=module, duration=time.perf_counter() - start, error=error)
+
+
+def _output_files(model: ModelHeader) -> list[str]:
+    # lower case, as the files of models differing only by case collide on case-insensitive file systems
+    name = model.name.lower()
+    return [f"{name}.py", f"{name}_bindings.py", f"{name}.exports", f"{name}.layout.json"]
+
+
+def _find_file_collisions(models: list[ModelHeader]) -> dict[str, str]:
+    """Returns an error for every model writing a file that another model or the shared binding file writes too."""
+    writers: dict[str, list[str]] = {f"{_SHARED_BINDINGS_NAME}.py": ["the shared binding file"]}
+    for model in models:
+        for file_name in _output_files(model):
+            writers.setdefault(file_name, []).append(model.header)
+    errors: dict[str, str] = {}
+    for model in models:
+        for file_name in _output_files(model):
+            others = [writer for writer in writers[file_name] if writer != model.header]
+            if len(others) > 0 and model.header not in errors:
+                errors[model.header] = f"{file_name} of {model.name} collides with the one of {', '.join(others)} " \
+                                       f"in the shared output directory"
+    return errors
+
+
+def _write_shared_binding_file(modules: list[Module], output_path: str) -> Optional[BindingFile]:
+    # without the shared binding file, the bindings of every model define all their types
+    try:
+        shared_binding_file = SharedBindingFileGenerator().generate(modules, _SHARED_BINDINGS_NAME)
+        output = BufferedFileOutput(os.path.join(output_path, shared_binding_file.name))
+        PythonBindingWriter(CtypesMapper()).write(shared_binding_file, output)
+        output.close()
+    except Exception:
+        print("The shared binding file could not be generated, the bindings of every model define all their types")
+        print(traceback.format_exc())
+        return None
+    print(f"{len(shared_binding_file.elements)} shared elements written to {shared_binding_file.name}")
+    return shared_binding_file
+
+
+def _generate_with_shared_types(
+        parse_result: _ParseResult,
+        output_path: str,
+        shared_binding_file: Optional[BindingFile]
+) -> BatchResult:
+    start = time.perf_counter()
+    error = None
+    try:
+        ctypes_mapper = CtypesMapper()
+        system = SystemGenerator().generate(
+            parse_result.module,
+            name=_bindings_name(parse_result.model.name),
+            binary_basename=parse_result.model.name,
+            bindings_name=f"{parse_result.model.name.lower()}_bindings",
+            shared_binding_file=shared_binding_file,
+            sample_time_ratios=read_sample_time_ratios(parse_result.model.header)
+        )
+        SystemWriter(ctypes_mapper).write(system, output_path, PythonBindingWriter(ctypes_mapper), shared_binding_file)
+    except Exception:
+        error = traceback.format_exc()
+    return BatchResult(model=parse_result.model, output_path=output_path,
+                       duration=parse_result.duration + time.perf_counter() - start, error=error)
+
+
+def generate_all_bindings_with_shared_types(
+        models: list[ModelHeader],
+        output_path: str,
+        jobs: Optional[int] = None
+) -> list[BatchResult]:
+    """
+    Generates the bindings of all models into the same directory. Types that are identical in several models
+    are only defined once, in a binding file that is imported by the bindings of the models. Models whose files
+    would overwrite the ones of another model fail.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        parse_results = list(executor.map(_parse, models))
+        collisions = _find_file_collisions([result.model for result in parse_results if result.error is None])
+        parsed = [result for result in parse_results
+                  if result.error is None and result.model.header not in collisions]
+        results = [BatchResult(model=result.model, output_path=output_path, duration=result.duration,
+                               error=result.error or collisions[result.model.header])
+                   for result in parse_results if result.error is not None or result.model.header in collisions]
+
+        shared_binding_file = _write_shared_binding_file([result.module for result in parsed], output_path)
+        futures = [executor.submit(_generate_with_shared_types, result, output_path, shared_binding_file)
+                   for result in parsed]
+        for future in as_completed(futures):
+            result = future.result()
+            status = "ok" if result.error is None else "FAILED"
+            print(f"[{status}] {result.model.name} ({result.duration:.2f}s)")
+            results.append(result)
+    return sorted(results, key=lambda it: it.model.name)
+
+
+def print_summary(results: list[BatchResult]):
+    failed = [result for result in results if result.error is not None]
+    print()
+    print(f"{'Model':<40} {'Time':>10}  Status")
+    for result in results:
+        status = "ok" if result.error is None else "failed"
+        print(f"{result.model.name:<40} {result.duration:>9.2f}s  {status}")
+    print(f"{len(results) - len(failed)} succeeded, {len(failed)} failed, "
+          f"{sum(result.duration for result in results):.2f}s total")
+    for result in failed:
+        print()
+        print(f"{result.model.name} ({result.model.header}):")
+        print(result.error)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate python bindings for all Simulink Code Generator models found in a directory tree.'
+    )
+    parser.add_argument(dest='models_path', type=dir_path, action=PathAction)
+    parser.add_argument(dest='output_path', action='store', type=dir_path)
+    parser.add_argument('-j', '--jobs', dest='jobs', action='store', type=int, default=None)
+    parser.add_argument('-s', '--shared-types', dest='shared_types', action='store_true', default=False,
+                        help='write all models into the output path and define types, which are identical in several '
+                             'models, only once in a shared binding file')
+
+    arguments = parser.parse_args(sys.argv[1:])
+
+    model_headers = find_model_headers(arguments.models_path)
+    print(f"Found {len(model_headers)} models in {arguments.models_path}")
+    if arguments.shared_types:
+        batch_results = generate_all_bindings_with_shared_types(model_headers, arguments.output_path, arguments.jobs)
+    else:
+        batch_results = generate_all_bindings(model_headers, arguments.output_path, arguments.jobs)
+    print_summary(batch_results)
+    if any(result.error is not None for result in batch_results):
+        sys.exit(1)
@@ -0,0 +1,52 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+from pycparser import CParser
+
+from astparser.parser import AstParser
+
+
+def create_header(declaration_count: int) -> str:
+    """Creates a preprocessed header with typedefs, buses using them and a global for every bus."""
+    lines = ["typedef double real_T;", "typedef int int32_T;"]
+    bus_count = max(declaration_count // 4, 1)
+    for index in range(bus_count):
+        lines.append(f"typedef real_T signal_{index}_T;")
+        lines.append(f"typedef struct {{ signal_{index}_T value; int32_T counts[4]; real_T *const *pointer; "
+                     f"struct {{ real_T inner; }} nested; }} Bus_{index};")
+        lines.append(f"extern Bus_{index} bus_{index};")
+        lines.append(f"extern void function_{index}(const Bus_{index} *bus, real_T (*callback)(int32_T));")
+    return "\n".join(lines)
+
+
+def run(declaration_counts: list[int], disable_gc: bool = False):
+    """
+    With disable_gc, the garbage collector is turned off while parsing. The conversion only creates acyclic objects,
+    but the collector keeps rescanning the large AST.
+    """
+    print(f"{'Declarations':>12} {'Time':>10} {'Peak memory':>14}")
+    for declaration_count in declaration_counts:
+        ast = CParser().parse(create_header(declaration_count), "model.h")
+        parser = AstParser()
+        parser.origin_file_filter = lambda it: True
+        if disable_gc:
+            gc.disable()
+        start = time.perf_counter()
+        parser.parse(ast)
+        duration = time.perf_counter() - start
+        # tracing slows down the parser a lot, so the memory is measured in a separate run
+        tracemalloc.start()
+        parser.parse(ast)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if disable_gc:
+            gc.enable()
+        print(f"{len(ast.ext):>12} {duration:>9.3f}s {peak / 1024 / 1024:>11.1f}MiB")
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    run([int(count) for count in arguments if count != "--disable-gc"] or [10_000, 100_000],
+        disable_gc="--disable-gc" in arguments)
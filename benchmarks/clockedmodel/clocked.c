@@ -0,0 +1,29 @@
+#include "clocked.h"
+
+X_clocked_T clocked_X;
+ExtU_clocked_T clocked_U;
+ExtY_clocked_T clocked_Y;
+static RT_MODEL_clocked_T clocked_M_;
+RT_MODEL_clocked_T *const clocked_M = &clocked_M_;
+
+void clocked_initialize(void)
+{
+  clocked_M->errorStatus = (const char_T *)0;
+  clocked_M->contStates = &clocked_X;
+  clocked_M->Timing.clockTick0 = 0;
+  clocked_X.x = 0.0;
+  clocked_U.u = 0.0;
+}
+
+void clocked_step(void)
+{
+  X_clocked_T *x = clocked_M->contStates;
+  real_T t = 0.01 * clocked_M->Timing.clockTick0;
+  clocked_Y.y = x->x + 2.0 * clocked_U.u + t;
+  x->x = 0.5 * x->x + clocked_U.u + t;
+  clocked_M->Timing.clockTick0++;
+}
+
+void clocked_terminate(void)
+{
+}
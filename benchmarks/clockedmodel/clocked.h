@@ -0,0 +1,41 @@
+/*
+ * Time-dependent model in the layout of the Simulink Embedded Coder (ERT). The
+ * clock ticks live in the real time model behind clocked_M, the step adds the
+ * model time to the output and the next state:
+ * y = x + 2 u + t, x[k + 1] = 0.5 x + u + t with t = 0.01 clockTick0.
+ */
+#ifndef CLOCKED_H
+#define CLOCKED_H
+#include "rtwtypes.h"
+
+typedef struct {
+  real_T x;
+} X_clocked_T;
+
+typedef struct {
+  real_T u;
+} ExtU_clocked_T;
+
+typedef struct {
+  real_T y;
+} ExtY_clocked_T;
+
+typedef struct tag_RTM_clocked_T RT_MODEL_clocked_T;
+struct tag_RTM_clocked_T {
+  const char_T *errorStatus;
+  X_clocked_T *contStates;
+  struct {
+    uint32_T clockTick0;
+  } Timing;
+};
+
+extern X_clocked_T clocked_X;
+extern ExtU_clocked_T clocked_U;
+extern ExtY_clocked_T clocked_Y;
+extern RT_MODEL_clocked_T *const clocked_M;
+
+extern void clocked_initialize(void);
+extern void clocked_step(void);
+extern void clocked_terminate(void);
+
+#endif
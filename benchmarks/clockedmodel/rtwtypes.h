@@ -0,0 +1,8 @@
+#ifndef RTWTYPES_H
+#define RTWTYPES_H
+typedef int int32_T;
+typedef double real_T;
+typedef int int_T;
+typedef char char_T;
+typedef unsigned int uint32_T;
+#endif
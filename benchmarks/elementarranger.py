@@ -0,0 +1,40 @@
+import sys
+
+from bindinggenerator import primitive_names
+from bindinggenerator.generator import ElementArranger
+from bindinggenerator.model import CtypeContainer, CtypeContainerType, CtypeContainerProperty, CtypeFieldPointer, \
+    NamedCtypeFieldType, Element
+
+
+def _struct(name: str, properties: list[CtypeContainerProperty]) -> CtypeContainer:
+    return CtypeContainer(name=name, container_type=CtypeContainerType.STRUCT, properties=properties)
+
+
+def create_elements(cycle_count: int) -> list[Element]:
+    """Creates pairs of structs referencing each other by pointer, plus a struct containing each pair."""
+    elements: list[Element] = []
+    for index in range(cycle_count):
+        first, second = f"First_{index}", f"Second_{index}"
+        elements += [
+            _struct(first, [CtypeContainerProperty("second", CtypeFieldPointer(NamedCtypeFieldType(second))),
+                            CtypeContainerProperty("value", NamedCtypeFieldType("double"))]),
+            _struct(second, [CtypeContainerProperty("first", CtypeFieldPointer(NamedCtypeFieldType(first))),
+                             CtypeContainerProperty("value", NamedCtypeFieldType("int"))]),
+            _struct(f"Outer_{index}", [CtypeContainerProperty("first", NamedCtypeFieldType(first))])
+        ]
+    return elements
+
+
+def run(cycle_counts: list[int]):
+    print(f"{'Cycles':>10} {'Elements':>10} {'Rounds':>8} {'Splits':>8} {'Time':>10}")
+    for cycle_count in cycle_counts:
+        elements = create_elements(cycle_count)
+        arranger = ElementArranger()
+        arranger.arrange(elements, primitive_names)
+        statistics = arranger.statistics
+        print(f"{cycle_count:>10} {len(elements):>10} {statistics.sort_rounds:>8} {statistics.splits:>8} "
+              f"{statistics.duration:>9.3f}s")
+
+
+if __name__ == '__main__':
+    run([int(count) for count in sys.argv[1:]] or [100, 1_000, 10_000])
@@ -0,0 +1,120 @@
+import sys
+import tempfile
+import time
+
+import bindinggenerator.model
+from benchmarks.pipeline import SCALES
+from benchmarks.syntheticmodel import SyntheticModelHeaderCreator
+from bindinggenerator import primitive_names
+from bindinggenerator.generator import PythonCodeElementGraphCreator, PythonBindingFileGenerator, AstTypeConverter, \
+    _get_name_of_type
+from bindinggenerator.model import CtypeContainer, CtypeContainerDefinition, CtypeContainerDeclaration, \
+    CtypeContainerElement, SplittableElement, Definition, Element, get_base_type_names
+from main import parse_header
+from topologicalsort import Node
+
+
+class ReferenceElementGraphCreator(PythonCodeElementGraphCreator):
+    """The graph creation before the elements were indexed by name, every lookup filters all elements."""
+
+    def create(self, elements: list[Element]) -> list[Node]:
+        return [self._create_reference_node(element, elements) for element in elements]
+
+    @staticmethod
+    def _get_reference_elements_by_name(name: str, elements: list[Element]) -> list[Element]:
+        return list(filter(lambda it: it.name == name, elements))
+
+    def _get_reference_recursive_direct_dependencies(self, element: Element, elements: list[Element]):
+        if isinstance(element, CtypeContainerElement):
+            return [self._mark_as_direct_dependency_name(element.name)]
+        elif isinstance(element, bindinggenerator.model.Enum):
+            return []
+        elif isinstance(element, Definition):
+            direct_dependency = _get_name_of_type(element.for_type)
+            dependencies = [element.name]
+            if direct_dependency is not None:
+                found = self._get_reference_elements_by_name(direct_dependency, elements)
+                if len(found) == 0:
+                    if direct_dependency not in self.already_resolved_dependencies:
+                        raise Exception("Missing dependency already when building the graph")
+                else:
+                    dependencies += self._get_reference_recursive_direct_dependencies(found[0], elements)
+            return dependencies
+        else:
+            raise Exception("Unhandled case")
+
+    def _create_reference_node(self, element: Element, elements: list[Element]) -> Node:
+        if isinstance(element, Definition):
+            return Node(keys=[element.name], dependencies=get_base_type_names(element.for_type), data=element)
+        elif isinstance(element, CtypeContainerDefinition):
+            keys = [self._mark_as_direct_dependency_name(element.name)]
+            dependencies = self._get_dependencies(element)
+            direct_dependencies = self._get_direct_ctype_dependencies(element)
+            dependencies = [dependency
+                            for dependency in dependencies
+                            if dependency not in direct_dependencies and
+                            dependency not in self.already_resolved_dependencies]
+            dependencies += [d
+                             for dependency in direct_dependencies
+                             for element in self._get_reference_elements_by_name(dependency, elements)
+                             for d in self._get_reference_recursive_direct_dependencies(element, elements)]
+            if not isinstance(element, CtypeContainer):
+                dependencies.append(element.name)
+            else:
+                keys.append(element.name)
+            return Node(keys=keys, dependencies=list(set(dependencies)), data=element)
+        elif isinstance(element, (CtypeContainerDeclaration, bindinggenerator.model.Enum)):
+            return Node(keys=[element.name], dependencies=[], data=element)
+        else:
+            raise Exception(f"Unhandled element type {element}")
+
+
+def _create(graph_creator: PythonCodeElementGraphCreator, elements: list[Element]) -> tuple[list[Node], float]:
+    graph_creator.already_resolved_dependencies = set(primitive_names)
+    start = time.perf_counter()
+    graph = graph_creator.create(elements)
+    return graph, time.perf_counter() - start
+
+
+def compare(expected: list[Node], actual: list[Node]) -> list[str]:
+    """Lists the nodes whose keys, dependencies or elements differ."""
+    if len(expected) != len(actual):
+        return [f"{len(actual)} nodes instead of {len(expected)}"]
+    return [f"node {index} {expected_node.keys}: {actual_node.keys} {sorted(actual_node.dependencies)}, "
+            f"expected {sorted(expected_node.dependencies)}"
+            for index, (expected_node, actual_node) in enumerate(zip(expected, actual))
+            if expected_node.keys != actual_node.keys or
+            sorted(expected_node.dependencies) != sorted(actual_node.dependencies) or
+            expected_node.data is not actual_node.data]
+
+
+def _split(elements: list[Element]) -> list[Element]:
+    # the graphs of the later rounds of the arrangement contain split elements
+    return [split_element for element in elements
+            for split_element in (element.split() if isinstance(element, SplittableElement) else [element])]
+
+
+def run(scales: list[str]) -> bool:
+    print(f"{'Scale':<8} {'Elements':>10} {'Split':>6} {'Reference':>10} {'Indexed':>10} {'Differences':>12}")
+    equivalent = True
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            header = SyntheticModelHeaderCreator().write(SCALES[scale], directory)
+            module = parse_header(header)
+        elements = PythonBindingFileGenerator().generate(module, "bindings", AstTypeConverter()).elements
+        for split, scale_elements in [(False, elements), (True, _split(elements))]:
+            expected, reference_duration = _create(ReferenceElementGraphCreator(), scale_elements)
+            actual, duration = _create(PythonCodeElementGraphCreator(), scale_elements)
+            differences = compare(expected, actual)
+            print(f"{scale:<8} {len(scale_elements):>10} {str(split):>6} {reference_duration:>9.3f}s "
+                  f"{duration:>9.3f}s {len(differences):>12}")
+            for difference in differences[:10]:
+                print(f"  {difference}")
+            equivalent = equivalent and len(differences) == 0
+    return equivalent
+
+
+if __name__ == '__main__':
+    # the reference implementation takes minutes for the large scale, the deep one exceeds its recursion limit
+    if not run(sys.argv[1:] or ["small", "medium"]):
+        sys.exit(1)
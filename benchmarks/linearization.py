@@ -0,0 +1,82 @@
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from linearization import linearize, Linearization
+from main import generate_bindings
+
+_MODEL_DIRECTORY = os.path.join(os.path.dirname(__file__), "clockedmodel")
+_MAKE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "librarycompiler", "Makefile")
+_BINARY_NAME = "clocked_model"
+_BINDINGS_NAME = "Clocked"
+# the model time is part of the output and the next state, but not of their derivatives
+_EXPECTED = Linearization(A=np.array([[0.5]]), B=np.array([[1.0]]), C=np.array([[1.0]]), D=np.array([[2.0]]),
+                          states=["x"], inputs=["u"], outputs=["y"])
+
+
+def build_model(directory: str) -> str:
+    """Compiles the time-dependent model with the local compiler and generates its bindings into the directory."""
+    source_directory = os.path.join(directory, "source")
+    shutil.copytree(_MODEL_DIRECTORY, source_directory)
+    output_directory = os.path.join(directory, "output")
+    os.makedirs(output_directory)
+    subprocess.run(["make", "-f", _MAKE_FILE, "so", f"name={_BINARY_NAME}", f"output_dir={output_directory}",
+                    "CFLAGS=-O2"],
+                   cwd=source_directory, check=True, stdout=subprocess.DEVNULL)
+    generate_bindings(os.path.join(source_directory, "clocked.h"), output_directory, _BINDINGS_NAME, _BINARY_NAME)
+    return output_directory
+
+
+def _load_system(output_directory: str):
+    sys.path.insert(0, output_directory)
+    try:
+        return getattr(importlib.import_module(_BINDINGS_NAME.lower()), _BINDINGS_NAME)()
+    finally:
+        sys.path.remove(output_directory)
+
+
+def compare(expected: Linearization, actual: Linearization) -> list[str]:
+    """Lists the matrices that differ by more than the error of the forward differences."""
+    return [f"{name} {getattr(actual, name).tolist()}, expected {getattr(expected, name).tolist()}"
+            for name in ["A", "B", "C", "D"]
+            if not np.allclose(getattr(actual, name), getattr(expected, name), atol=1e-4)]
+
+
+def run(worker_counts: list[int], steps: int) -> bool:
+    """
+    Linearizes the model after steps steps with every worker count. The matrices only match if every perturbation
+    starts at the model time of the system.
+    """
+    print(f"{'Workers':>8} {'Time':>10} {'Differences':>12}")
+    equivalent = True
+    directory = tempfile.mkdtemp()
+    try:
+        system = _load_system(build_model(directory))
+        system.initialize()
+        for _ in range(steps):
+            system.step()
+        for workers in worker_counts:
+            start = time.perf_counter()
+            result = linearize(system, workers=workers)
+            duration = time.perf_counter() - start
+            differences = compare(_EXPECTED, result)
+            print(f"{workers:>8} {duration:>9.3f}s {len(differences):>12}")
+            for difference in differences:
+                print(f"  {difference}")
+            equivalent = equivalent and len(differences) == 0
+        system.terminate()
+    finally:
+        # the binaries stay loaded, they cannot be removed on every platform
+        shutil.rmtree(directory, ignore_errors=True)
+    return equivalent
+
+
+if __name__ == '__main__':
+    if not run([int(count) for count in sys.argv[1:]] or [1, 2, 3], steps=100):
+        sys.exit(1)
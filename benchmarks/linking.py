@@ -0,0 +1,110 @@
+import argparse
+import ctypes
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+
+from librarycompiler.SimulinkModelCompiler import SimulinkModelCompiler
+from main import generate_bindings
+
+_MODEL_DIRECTORY = os.path.join(os.path.dirname(__file__), "standinmodel")
+_BINARY_NAME = "standin_model"
+_BINDINGS_NAME = "StandIn"
+
+
+@dataclass(frozen=True)
+class LinkVariant:
+    name: str
+    exports: bool
+    gc_sections: bool
+    strip: bool
+
+
+@dataclass(frozen=True)
+class LinkResult:
+    variant: str
+    size: int
+    load_time: float
+
+
+VARIANTS = [
+    LinkVariant(name="all symbols", exports=False, gc_sections=False, strip=False),
+    LinkVariant(name="exports", exports=True, gc_sections=False, strip=False),
+    LinkVariant(name="exports, gc-sections", exports=True, gc_sections=True, strip=False),
+    LinkVariant(name="exports, gc-sections, strip", exports=True, gc_sections=True, strip=True)
+]
+
+
+def _write_sources(directory: str, helpers: int):
+    shutil.copytree(_MODEL_DIRECTORY, directory)
+    with open(os.path.join(directory, "standin_config.h"), "w") as file:
+        file.write("#define STANDIN_WIDTH 16\n#define STANDIN_COST 10\n")
+    # Simulink exports contain many non-static helpers, these are not even called by the model
+    lines = ['#include "rtwtypes.h"']
+    for index in range(helpers):
+        lines.append(f"real_T standin_helper_{index}(real_T x) {{ return x * {index + 1}.0 + {index}.5; }}")
+    with open(os.path.join(directory, "standin_helpers.c"), "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def _load_time(library: str, loads: int) -> float:
+    # every copy has its own name, so the dynamic loader really loads it instead of returning the loaded one
+    with tempfile.TemporaryDirectory() as directory:
+        copies = [os.path.join(directory, f"copy{index}.so") for index in range(loads)]
+        for copy in copies:
+            shutil.copyfile(library, copy)
+        start = time.perf_counter()
+        for copy in copies:
+            ctypes.CDLL(copy)
+        return (time.perf_counter() - start) / loads
+
+
+def measure(helpers: int, loads: int) -> list[LinkResult]:
+    compiler = SimulinkModelCompiler()
+    platform = compiler.native_platform()
+    if platform is None:
+        raise Exception("The benchmark needs a native build for the platform of the host")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        source_directory = os.path.join(directory, "source")
+        _write_sources(source_directory, helpers)
+        bindings_directory = os.path.join(directory, "bindings")
+        os.makedirs(bindings_directory)
+        generate_bindings(os.path.join(source_directory, "standin.h"), bindings_directory, _BINDINGS_NAME,
+                          _BINARY_NAME)
+        exports = os.path.join(bindings_directory, f"{_BINARY_NAME}.exports")
+        for index, variant in enumerate(VARIANTS):
+            output_directory = os.path.join(directory, f"variant{index}")
+            os.makedirs(output_directory)
+            compiler = SimulinkModelCompiler(exports=exports if variant.exports else None,
+                                             gc_sections=variant.gc_sections,
+                                             strip=variant.strip)
+            compiler.compile(source_directory, output_directory, _BINARY_NAME, platforms=[platform])
+            library = os.path.join(output_directory, os.listdir(output_directory)[0])
+            results.append(LinkResult(variant=variant.name,
+                                      size=os.path.getsize(library),
+                                      load_time=_load_time(library, loads)))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare size and load time of the stand-in model linked with '
+                                                 'different options.')
+    parser.add_argument('--helpers', dest='helpers', type=int, default=2000,
+                        help='number of non-static helper functions added to the stand-in model')
+    parser.add_argument('--loads', dest='loads', type=int, default=50)
+    parser.add_argument('--output', dest='output', default=None, help='write the results to this JSON file')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    link_results = measure(arguments.helpers, arguments.loads)
+    print()
+    print(f"{'Variant':<30} {'Size':>10} {'Load':>10}")
+    for result in link_results:
+        print(f"{result.variant:<30} {result.size / 1024:>8.1f}kB {result.load_time * 1e6:>8.1f}us")
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump([asdict(result) for result in link_results], file, indent=2)
@@ -0,0 +1,73 @@
+import sys
+import time
+
+from astparser.model import Module, TypeDefinition, Struct, Property, Field, Container
+from astparser.moduelcleaner import ModuleCleaner
+from astparser.types import NamedType, Pointer
+from bindinggenerator import primitive_names
+
+
+def _named(name: str) -> NamedType:
+    return NamedType(name=name, constant=False)
+
+
+def create_typedef_chain_module(length: int) -> Module:
+    """Creates a single field whose type is the end of a chain of typedefs."""
+    type_definitions = [TypeDefinition(name="chain_0", for_type=_named("double"))]
+    type_definitions += [TypeDefinition(name=f"chain_{index}", for_type=_named(f"chain_{index - 1}"))
+                         for index in range(1, length)]
+    return Module(
+        type_definitions=list(reversed(type_definitions)),
+        container=[],
+        enums=[],
+        fields=[Field(name="chain", type=_named(f"chain_{length - 1}"))],
+        methods=[]
+    )
+
+
+def create_bus_hierarchy_module(width: int, depth: int) -> Module:
+    """Creates a tree of buses, where every bus has `width` child buses, plus unused buses of the same size."""
+    containers: list[Container] = []
+
+    def add_bus(name: str, level: int):
+        properties = [Property(name="value", type=_named("double"))]
+        if level < depth:
+            for index in range(width):
+                child = f"{name}_{index}"
+                add_bus(child, level + 1)
+                properties.append(Property(name=f"child_{index}", type=_named(child)))
+                properties.append(Property(name=f"pointer_{index}", type=Pointer(of=_named(child), constant=False)))
+        containers.append(Struct(name=name, properties=properties, inner_containers=[]))
+
+    add_bus("Bus", 0)
+    add_bus("UnusedBus", 0)
+    return Module(
+        type_definitions=[],
+        container=containers,
+        enums=[],
+        fields=[Field(name="bus", type=_named("Bus"))],
+        methods=[]
+    )
+
+
+def _measure(name: str, module: Module):
+    cleaner = ModuleCleaner()
+    cleaner.externally_known_type_name = primitive_names
+    start = time.perf_counter()
+    cleaned = cleaner.remove_not_used_elements(module)
+    duration = time.perf_counter() - start
+    elements = len(module.type_definitions) + len(module.container)
+    kept = len(cleaned.type_definitions) + len(cleaned.container)
+    print(f"{name:<28} {elements:>10} {kept:>10} {duration:>9.3f}s")
+
+
+def run(scale: int):
+    print(f"{'Module':<28} {'Elements':>10} {'Kept':>10} {'Time':>10}")
+    for length in [1_000 * scale, 10_000 * scale]:
+        _measure(f"typedef chain {length}", create_typedef_chain_module(length))
+    for width, depth in [(4, 5 + scale), (10 * scale, 3), (1_000 * scale, 1)]:
+        _measure(f"bus hierarchy {width}x{depth}", create_bus_hierarchy_module(width, depth))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
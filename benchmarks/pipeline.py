@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmarks.syntheticmodel import SyntheticModelOptions, SyntheticModelHeaderCreator
+from main import generate_bindings
+from profiler import StageProfiler
+
+SCALES: dict[str, SyntheticModelOptions] = {
+    "small": SyntheticModelOptions(buses=10, nesting_depth=2, array_size=4, typedef_chain_length=3, enums=2,
+                                   recursive_cycles=1),
+    "medium": SyntheticModelOptions(buses=100, nesting_depth=3, array_size=16, typedef_chain_length=20, enums=10,
+                                    recursive_cycles=20),
+    "large": SyntheticModelOptions(buses=500, nesting_depth=4, array_size=64, typedef_chain_length=100, enums=50,
+                                   recursive_cycles=200),
+    "deep": SyntheticModelOptions(buses=20, nesting_depth=30, array_size=4, typedef_chain_length=500, enums=2,
+                                  recursive_cycles=5),
+}
+
+_DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "pipeline_baseline.json")
+
+
+def _profile(header: str, output_path: str, trace_memory: bool) -> StageProfiler:
+    profiler = StageProfiler()
+    profiler.trace_memory = trace_memory
+    generate_bindings(header, output_path, "Synthetic", "synthetic", profiler)
+    return profiler
+
+
+def run_scale(options: SyntheticModelOptions) -> dict[str, dict[str, float]]:
+    with tempfile.TemporaryDirectory() as directory:
+        header = SyntheticModelHeaderCreator().write(options, directory)
+        # timings and memory are taken from separate runs, as tracing the memory distorts the timings
+        timed = _profile(header, directory, trace_memory=False)
+        traced = _profile(header, directory, trace_memory=True)
+
+    declarations = next(result.counters["declarations"] for result in timed.results if result.name == "c parsing")
+    return {
+        timed_result.name: {
+            "wall_time": timed_result.wall_time,
+            "cpu_time": timed_result.cpu_time,
+            "declarations_per_second": declarations / timed_result.wall_time if timed_result.wall_time > 0 else 0,
+            "peak_memory": traced_result.peak_memory
+        }
+        for timed_result, traced_result in zip(timed.results, traced.results)
+    }
+
+
+def _scale(name: str) -> str:
+    if name not in SCALES:
+        raise argparse.ArgumentTypeError(f"{name} is not one of {', '.join(SCALES.keys())}")
+    return name
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for scale, stages in results.items():
+        for stage, measurement in stages.items():
+            reference = baseline.get(scale, {}).get(stage)
+            if reference is None:
+                continue
+            for metric in ["wall_time", "peak_memory"]:
+                if reference[metric] > 0 and measurement[metric] > reference[metric] * tolerance:
+                    regressions.append(f"{scale}/{stage} {metric}: {measurement[metric]:.4g} "
+                                       f"(baseline {reference[metric]:.4g})")
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"{'Scale':<8} {'Stage':<20} {'Wall time':>10} {'Decl/s':>12} {'Peak memory':>12}")
+    for scale, stages in results.items():
+        for stage, measurement in stages.items():
+            print(f"{scale:<8} {stage:<20} {measurement['wall_time']:>9.3f}s "
+                  f"{measurement['declarations_per_second']:>12.0f} {measurement['peak_memory'] / 1024 / 1024:>9.1f}MiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every bindings generation stage on synthetic models.')
+    parser.add_argument('scales', nargs='*', type=_scale, help=f'any of {", ".join(SCALES.keys())}')
+    parser.add_argument('--baseline', dest='baseline', default=_DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', dest='save_baseline', action='store_true', default=False)
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=1.25,
+                        help='factor a measurement may exceed the baseline by before it counts as a regression')
+    parser.add_argument('--output', dest='output', default=None, help='write the results to this JSON file')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    benchmark_results = {scale: run_scale(SCALES[scale]) for scale in arguments.scales or SCALES.keys()}
+    print_results(benchmark_results)
+
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump(benchmark_results, file, indent=2)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w") as file:
+            json.dump(benchmark_results, file, indent=2)
+        print(f"Saved baseline to {arguments.baseline}")
+    elif os.path.isfile(arguments.baseline):
+        with open(arguments.baseline) as file:
+            found_regressions = compare(benchmark_results, json.load(file), arguments.tolerance)
+        for regression in found_regressions:
+            print(f"Regression: {regression}")
+        if len(found_regressions) > 0:
+            sys.exit(1)
+        print("No regressions compared to the baseline")
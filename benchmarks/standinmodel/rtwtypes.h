@@ -0,0 +1,7 @@
+#ifndef RTWTYPES_H
+#define RTWTYPES_H
+typedef int int32_T;
+typedef double real_T;
+typedef int int_T;
+typedef char char_T;
+#endif
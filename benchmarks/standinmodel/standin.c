@@ -0,0 +1,42 @@
+#include "standin.h"
+
+ExtU_standin_T standin_U;
+ExtY_standin_T standin_Y;
+B_standin_T standin_B;
+P_standin_T standin_P;
+static RT_MODEL_standin_T standin_M_;
+RT_MODEL_standin_T *const standin_M = &standin_M_;
+
+void standin_initialize(void)
+{
+  int_T i;
+  for (i = 0; i < STANDIN_WIDTH; i++) {
+    standin_U.In[i] = 0.0;
+    standin_B.State[i] = 0.0;
+    standin_P.Gain[i] = 1.0 / (i + 1);
+  }
+  standin_U.Enable = 1.0;
+  standin_P.Decay = 0.5;
+  standin_M->errorStatus = (const char_T *)0;
+}
+
+void standin_step(void)
+{
+  int_T i;
+  int_T k;
+  real_T x;
+  standin_Y.Sum = 0.0;
+  for (i = 0; i < STANDIN_WIDTH; i++) {
+    x = standin_U.In[i] * standin_U.Enable;
+    for (k = 0; k < STANDIN_COST; k++) {
+      x = x * standin_P.Decay + standin_P.Gain[i];
+    }
+    standin_B.State[i] += x;
+    standin_Y.Out[i] = standin_B.State[i];
+    standin_Y.Sum += standin_Y.Out[i];
+  }
+}
+
+void standin_terminate(void)
+{
+}
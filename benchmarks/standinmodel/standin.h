@@ -0,0 +1,46 @@
+/*
+ * Stand-in for a model exported by the Simulink Embedded Coder (ERT).
+ * STANDIN_WIDTH sets the number of inputs and outputs, STANDIN_COST the number of
+ * multiply-adds done per output and step. Both are defined in standin_config.h.
+ */
+#ifndef STANDIN_H
+#define STANDIN_H
+#include "rtwtypes.h"
+#include "standin_config.h"
+
+typedef struct {
+  real_T In[STANDIN_WIDTH];
+  real_T Enable;
+} ExtU_standin_T;
+
+typedef struct {
+  real_T Out[STANDIN_WIDTH];
+  real_T Sum;
+} ExtY_standin_T;
+
+typedef struct {
+  real_T State[STANDIN_WIDTH];
+} B_standin_T;
+
+typedef struct P_standin_T_ P_standin_T;
+struct P_standin_T_ {
+  real_T Gain[STANDIN_WIDTH];
+  real_T Decay;
+};
+
+typedef struct tag_RTM_standin_T RT_MODEL_standin_T;
+struct tag_RTM_standin_T {
+  const char_T *errorStatus;
+};
+
+extern ExtU_standin_T standin_U;
+extern ExtY_standin_T standin_Y;
+extern B_standin_T standin_B;
+extern P_standin_T standin_P;
+extern RT_MODEL_standin_T *const standin_M;
+
+extern void standin_initialize(void);
+extern void standin_step(void);
+extern void standin_terminate(void);
+
+#endif
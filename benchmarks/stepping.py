@@ -0,0 +1,129 @@
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+
+from main import generate_bindings
+
+_MODEL_DIRECTORY = os.path.join(os.path.dirname(__file__), "standinmodel")
+_MAKE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "librarycompiler", "Makefile")
+_BINARY_NAME = "standin_model"
+_BINDINGS_NAME = "StandIn"
+
+
+@dataclass(frozen=True)
+class ModelSize:
+    width: int
+    cost: int
+
+
+@dataclass(frozen=True)
+class SteppingResult:
+    backend: str
+    width: int
+    cost: int
+    steps_per_second: float
+    step_time: float
+    input_write_time: float
+    output_read_time: float
+
+
+SIZES = [ModelSize(width=1, cost=0), ModelSize(width=16, cost=10), ModelSize(width=256, cost=10),
+         ModelSize(width=1024, cost=100)]
+
+
+def build_model(size: ModelSize, directory: str, backend: str = "ctypes") -> str:
+    """Compiles the stand-in model with the local compiler and generates its bindings into the directory."""
+    source_directory = os.path.join(directory, "source")
+    shutil.copytree(_MODEL_DIRECTORY, source_directory)
+    with open(os.path.join(source_directory, "standin_config.h"), "w") as file:
+        file.write(f"#define STANDIN_WIDTH {size.width}\n#define STANDIN_COST {size.cost}\n")
+    output_directory = os.path.join(directory, "output")
+    os.makedirs(output_directory)
+    subprocess.run(["make", "-f", _MAKE_FILE, "so", f"name={_BINARY_NAME}", f"output_dir={output_directory}",
+                    "CFLAGS=-O2"],
+                   cwd=source_directory, check=True, stdout=subprocess.DEVNULL)
+    generate_bindings(os.path.join(source_directory, "standin.h"), output_directory, _BINDINGS_NAME, _BINARY_NAME,
+                      backend=backend)
+    return output_directory
+
+
+def _load_system(output_directory: str):
+    # every size has its own bindings module, so the cached one of the previous size must not be used
+    sys.modules.pop("bindings", None)
+    sys.modules.pop(_BINDINGS_NAME.lower(), None)
+    sys.modules.pop(f"_{_BINDINGS_NAME.lower()}_cffi", None)
+    sys.path.insert(0, output_directory)
+    try:
+        module = importlib.import_module(_BINDINGS_NAME.lower())
+        # the cffi backend imports its module when the system is created
+        return getattr(module, _BINDINGS_NAME)()
+    finally:
+        sys.path.remove(output_directory)
+
+
+def _time_per_call(function, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) / repetitions
+
+
+def measure(size: ModelSize, steps: int, backend: str = "ctypes") -> SteppingResult:
+    with tempfile.TemporaryDirectory() as directory:
+        system = _load_system(build_model(size, directory, backend))
+        system.initialize()
+        inputs = system.inputs
+        outputs = system.outputs
+
+        def write_input():
+            inputs.In[0] = 1.0
+
+        def read_output():
+            return outputs.Sum
+
+        step_time = _time_per_call(system.step, steps)
+        input_write_time = _time_per_call(write_input, steps)
+        output_read_time = _time_per_call(read_output, steps)
+        system.terminate()
+
+    return SteppingResult(
+        backend=backend,
+        width=size.width,
+        cost=size.cost,
+        steps_per_second=1 / step_time,
+        step_time=step_time,
+        input_write_time=input_write_time,
+        output_read_time=output_read_time
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark stepping the generated bindings of a stand-in model.')
+    parser.add_argument('--steps', dest='steps', type=int, default=100_000)
+    parser.add_argument('--output', dest='output', default=None, help='write the results to this JSON file')
+    parser.add_argument('--backend', dest='backends', action='append', default=None, choices=['ctypes', 'cffi'],
+                        help='backend of the bindings, can be given multiple times (default: ctypes and, if it is '
+                             'installed, cffi)')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    backends = arguments.backends
+    if backends is None:
+        backends = ["ctypes"] + (["cffi"] if importlib.util.find_spec("cffi") is not None else [])
+    results = [measure(size, arguments.steps, backend) for size in SIZES for backend in backends]
+    print(f"{'Backend':<8} {'Width':>6} {'Cost':>6} {'Steps/s':>12} {'Step':>10} {'Input write':>12} "
+          f"{'Output read':>12}")
+    for result in results:
+        print(f"{result.backend:<8} {result.width:>6} {result.cost:>6} {result.steps_per_second:>12.0f} "
+              f"{result.step_time * 1e6:>8.2f}us {result.input_write_time * 1e6:>10.2f}us "
+              f"{result.output_read_time * 1e6:>10.2f}us")
+    if arguments.output is not None:
+        with open(arguments.output, "w") as file:
+            json.dump([asdict(result) for result in results], file, indent=2)
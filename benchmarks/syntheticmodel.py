@@ -0,0 +1,129 @@
+import os
+from dataclasses import dataclass
+
+_RTWTYPES_HEADER = """#ifndef RTWTYPES_H
+#define RTWTYPES_H
+typedef signed char int8_T;
+typedef unsigned char uint8_T;
+typedef short int16_T;
+typedef unsigned short uint16_T;
+typedef int int32_T;
+typedef unsigned int uint32_T;
+typedef float real32_T;
+typedef double real64_T;
+typedef double real_T;
+typedef double time_T;
+typedef unsigned char boolean_T;
+typedef int int_T;
+typedef unsigned int uint_T;
+typedef char char_T;
+#endif
+"""
+
+
+@dataclass(frozen=True)
+class SyntheticModelOptions:
+    """Knobs of a synthetic header following the interface of Simulink Embedded Coder (ERT) exports."""
+    name: str = "synthetic"
+    buses: int = 10
+    nesting_depth: int = 2
+    array_size: int = 4
+    typedef_chain_length: int = 3
+    enums: int = 2
+    recursive_cycles: int = 1
+
+
+class SyntheticModelHeaderCreator:
+    def create(self, options: SyntheticModelOptions) -> str:
+        lines = [f"#ifndef {options.name.upper()}_H", f"#define {options.name.upper()}_H", '#include "rtwtypes.h"', ""]
+        lines += self._typedef_chain(options)
+        lines += self._enums(options)
+        lines += self._recursive_cycles(options)
+        lines += self._buses(options)
+        lines += self._globals(options)
+        lines += ["#endif", ""]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _chain_type_name(options: SyntheticModelOptions) -> str:
+        if options.typedef_chain_length == 0:
+            return "real_T"
+        return f"chain_{options.typedef_chain_length - 1}_T"
+
+    @staticmethod
+    def _typedef_chain(options: SyntheticModelOptions) -> list[str]:
+        previous = "real_T"
+        lines: list[str] = []
+        for index in range(options.typedef_chain_length):
+            lines.append(f"typedef {previous} chain_{index}_T;")
+            previous = f"chain_{index}_T"
+        return lines
+
+    @staticmethod
+    def _enums(options: SyntheticModelOptions) -> list[str]:
+        return [f"typedef enum {{ Mode_{index}_Off = 0, Mode_{index}_On, Mode_{index}_Fault = 8 }} Mode_{index}_T;"
+                for index in range(options.enums)]
+
+    @staticmethod
+    def _recursive_cycles(options: SyntheticModelOptions) -> list[str]:
+        lines: list[str] = []
+        for index in range(options.recursive_cycles):
+            lines += [
+                f"typedef struct Cycle_{index}_A_ Cycle_{index}_A;",
+                f"typedef struct Cycle_{index}_B_ Cycle_{index}_B;",
+                f"struct Cycle_{index}_A_ {{ Cycle_{index}_B *next; real_T value; }};",
+                f"struct Cycle_{index}_B_ {{ Cycle_{index}_A *previous; int32_T value; }};"
+            ]
+        return lines
+
+    def _buses(self, options: SyntheticModelOptions) -> list[str]:
+        lines: list[str] = []
+        for bus in range(options.buses):
+            # the innermost level is defined first, so every level can contain the next one by value
+            for level in reversed(range(options.nesting_depth + 1)):
+                properties = [
+                    f"real_T signal[{options.array_size}];",
+                    f"{self._chain_type_name(options)} chained;",
+                    "boolean_T valid;"
+                ]
+                if options.enums > 0:
+                    properties.append(f"Mode_{bus % options.enums}_T mode;")
+                if level < options.nesting_depth:
+                    properties.append(f"Bus_{bus}_{level + 1} child;")
+                lines.append(f"typedef struct {{ {' '.join(properties)} }} Bus_{bus}_{level};")
+        return lines
+
+    def _globals(self, options: SyntheticModelOptions) -> list[str]:
+        name = options.name
+        inputs = [f"Bus_{bus}_0 In{bus};" for bus in range(options.buses)] or ["real_T In;"]
+        outputs = [f"Bus_{bus}_0 Out{bus};" for bus in range(options.buses)] or ["real_T Out;"]
+        signals = [f"Bus_{bus}_0 Signal{bus};" for bus in range(options.buses)]
+        signals += [f"Cycle_{index}_A cycle{index};" for index in range(options.recursive_cycles)]
+        signals = signals or ["real_T Signal;"]
+        parameters = [f"real_T Gain{index}[{options.array_size}];" for index in range(max(options.buses, 1))]
+        return [
+            f"typedef struct {{ {' '.join(inputs)} }} ExtU_{name}_T;",
+            f"typedef struct {{ {' '.join(outputs)} }} ExtY_{name}_T;",
+            f"typedef struct {{ {' '.join(signals)} }} B_{name}_T;",
+            f"typedef struct P_{name}_T_ P_{name}_T;",
+            f"struct P_{name}_T_ {{ {' '.join(parameters)} }};",
+            f"typedef struct tag_RTM_{name}_T RT_MODEL_{name}_T;",
+            f"struct tag_RTM_{name}_T {{ const char_T *errorStatus; }};",
+            f"extern ExtU_{name}_T {name}_U;",
+            f"extern ExtY_{name}_T {name}_Y;",
+            f"extern B_{name}_T {name}_B;",
+            f"extern P_{name}_T {name}_P;",
+            f"extern RT_MODEL_{name}_T *const {name}_M;",
+            f"extern void {name}_initialize(void);",
+            f"extern void {name}_step(void);",
+            f"extern void {name}_terminate(void);"
+        ]
+
+    def write(self, options: SyntheticModelOptions, directory: str) -> str:
+        """Writes the header and the rtwtypes.h it includes to the directory and returns the path of the header."""
+        with open(os.path.join(directory, "rtwtypes.h"), "w") as file:
+            file.write(_RTWTYPES_HEADER)
+        header = os.path.join(directory, f"{options.name}.h")
+        with open(header, "w") as file:
+            file.write(self.create(options))
+        return header
@@ -0,0 +1,30 @@
+import random
+import sys
+import time
+
+from topologicalsort import Node, TopologicalSorter
+
+
+def create_graph(node_count: int, max_dependencies: int = 4, seed: int = 0) -> list[Node]:
+    rng = random.Random(seed)
+    graph = [Node(keys=[f"node_{index}"],
+                  dependencies=[f"node_{rng.randrange(index)}" for _ in range(rng.randint(0, max_dependencies))]
+                  if index > 0 else [],
+                  data=index)
+             for index in range(node_count)]
+    rng.shuffle(graph)
+    return graph
+
+
+def run(node_counts: list[int]):
+    print(f"{'Nodes':>10} {'Levels':>8} {'Time':>10}")
+    for node_count in node_counts:
+        graph = create_graph(node_count)
+        start = time.perf_counter()
+        result = TopologicalSorter().sort(graph)
+        duration = time.perf_counter() - start
+        print(f"{node_count:>10} {len(result.sorted_list):>8} {duration:>9.3f}s")
+
+
+if __name__ == '__main__':
+    run([int(count) for count in sys.argv[1:]] or [10_000, 25_000, 50_000, 100_000])
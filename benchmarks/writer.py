@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from bindinggenerator.model import BindingFile, Import, CtypeContainer, CtypeContainerType, CtypeContainerProperty, \
+    NamedCtypeFieldType, CtypeFieldTypeArray
+from bindinggenerator.writer import PythonBindingWriter, CtypesMapper, FileOutput, BufferedFileOutput, Output
+
+
+def create_binding_file(field_count: int, fields_per_container: int = 100) -> BindingFile:
+    containers = [CtypeContainer(
+        name=f"Bus_{index}",
+        container_type=CtypeContainerType.STRUCT,
+        properties=[CtypeContainerProperty(name=f"signal_{field}",
+                                           type=NamedCtypeFieldType("double") if field % 2 == 0
+                                           else CtypeFieldTypeArray(of=NamedCtypeFieldType("int"), size=4))
+                    for field in range(fields_per_container)]
+    ) for index in range(field_count // fields_per_container)]
+    return BindingFile(name="bindings.py", imports=[Import(None, ["ctypes"])], elements=containers)
+
+
+def _measure(binding_file: BindingFile, create_output: Callable[[str], Output], path: str) -> float:
+    start = time.perf_counter()
+    output = create_output(path)
+    PythonBindingWriter(CtypesMapper()).write(binding_file, output)
+    output.close()
+    return time.perf_counter() - start
+
+
+def run(field_count: int, repetitions: int = 5):
+    binding_file = create_binding_file(field_count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, binding_file.name)
+        for name, create_output in [("FileOutput", FileOutput), ("BufferedFileOutput", BufferedFileOutput)]:
+            duration = min(_measure(binding_file, create_output, path) for _ in range(repetitions))
+            print(f"{name:<20} {field_count:>8} fields {duration:>9.3f}s")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
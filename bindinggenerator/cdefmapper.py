@@ -0,0 +1,35 @@
+from bindinggenerator.model import CtypeFieldType, NamedCtypeFieldType, CtypeFieldPointer, CtypeFieldTypeArray, \
+    CtypeFieldFunctionPointer
+
+
+class CdefMapper:
+    """Maps the types of the bindings to C declarations, which are understood by cffi and the C compiler."""
+    _primitive_mappings: dict[str, str] = {
+        "byte": "signed char",
+        "unsigned": "unsigned int",
+        "int8": "int8_t",
+        "int16": "int16_t",
+        "int32": "int32_t",
+        "int64": "int64_t",
+        "unsigned byte": "unsigned char",
+        "unsigned int8": "uint8_t",
+        "unsigned int16": "uint16_t",
+        "unsigned int32": "uint32_t",
+        "unsigned int64": "uint64_t"
+    }
+
+    def declaration(self, typ: CtypeFieldType, declarator: str = "") -> str:
+        if isinstance(typ, NamedCtypeFieldType):
+            name = self._primitive_mappings.get(typ.name, typ.name)
+            return f"{name} {declarator}".strip()
+        elif isinstance(typ, CtypeFieldPointer):
+            if isinstance(typ.of, CtypeFieldTypeArray):
+                return self.declaration(typ.of, f"(*{declarator})")
+            return self.declaration(typ.of, f"*{declarator}")
+        elif isinstance(typ, CtypeFieldTypeArray):
+            return self.declaration(typ.of, f"{declarator}[{typ.size}]")
+        elif isinstance(typ, CtypeFieldFunctionPointer):
+            parameters = ", ".join(self.declaration(parameter) for parameter in typ.parameter_types) or "void"
+            return self.declaration(typ.return_type, f"(*{declarator})({parameters})")
+        else:
+            raise Exception(f"Unhandled case {typ}")
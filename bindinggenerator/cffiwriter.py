@@ -0,0 +1,220 @@
+import os.path
+from dataclasses import replace
+from typing import Optional
+
+from bindinggenerator.model import BindingFile, Element, Definition, Enum, CtypeContainer, \
+    CtypeContainerDeclaration, CtypeContainerDefinition, CtypeFieldPointer, CtypeFieldType, NamedCtypeFieldType, \
+    CtypeFieldFunctionPointer, System, SystemMethod, SystemField, CtypeContainerType, Import
+from bindinggenerator.cdefmapper import CdefMapper
+from bindinggenerator.writer import Output, BufferedFileOutput, PythonBindingWriter, SystemWriter
+
+
+class CdefWriter:
+    """
+    Writes the elements of binding files as C declarations and, for every function of a system, a function calling
+    it through a pointer.
+    """
+    __CONTAINER_KEYWORDS = {CtypeContainerType.STRUCT: "struct", CtypeContainerType.UNION: "union"}
+
+    _mapper: CdefMapper
+
+    def __init__(self, cdef_mapper: CdefMapper):
+        self._mapper = cdef_mapper
+
+    def write_cdef(self, system: System, output: Output):
+        """Writes the declarations cffi needs to access the system."""
+        for binding in system.bindingFiles:
+            self.write_binding_file(binding, output)
+        for method in system.methods:
+            self._write_method_caller(method, False, output)
+
+    def write_source(self, system: System, output: Output):
+        """Writes the C source of the module, which calls the functions of the library through pointers."""
+        for binding in system.bindingFiles:
+            self.write_binding_file(binding, output)
+        for method in system.methods:
+            self._write_method_caller(method, True, output)
+
+    def write_binding_file(self, file: BindingFile, output: Output):
+        for element in file.elements:
+            self._write(element, output)
+
+    def _write(self, element: Element, output: Output):
+        if isinstance(element, Definition):
+            output.write(f"typedef {self._mapper.declaration(element.for_type, element.name)};")
+            output.new_line()
+        elif isinstance(element, Enum):
+            # the values are only used from python, where the enum classes of the bindings provide them
+            pass
+        elif isinstance(element, CtypeContainer):
+            self._write_container_declaration(element, output)
+            self._write_container_definition(element, output)
+        elif isinstance(element, CtypeContainerDeclaration):
+            self._write_container_declaration(element, output)
+        elif isinstance(element, CtypeContainerDefinition):
+            self._write_container_definition(element, output)
+        else:
+            raise Exception(f"Unhandled element {element}")
+
+    def _write_container_declaration(self, declaration: CtypeContainerDeclaration, output: Output):
+        keyword = self.__CONTAINER_KEYWORDS[declaration.container_type]
+        output.write(f"typedef {keyword} {declaration.name} {declaration.name};")
+        output.new_line()
+
+    def _write_container_definition(self, definition: CtypeContainerDefinition, output: Output):
+        output.write(f"{self.__CONTAINER_KEYWORDS[definition.container_type]} {definition.name} {{")
+        output.new_line()
+        for field in definition.properties:
+            output.write(f"    {self._mapper.declaration(field.type, field.name)};")
+            output.new_line()
+        output.write("};")
+        output.new_line()
+
+    @staticmethod
+    def _parameter_types(method: SystemMethod) -> list[CtypeFieldType]:
+        # a (void) parameter list is parsed as a single void parameter
+        return [parameter.type for parameter in method.parameter if parameter.type != NamedCtypeFieldType("void")]
+
+    def function_pointer_type(self, method: SystemMethod) -> str:
+        return self._mapper.declaration(CtypeFieldFunctionPointer(return_type=method.return_type,
+                                                                  parameter_types=self._parameter_types(method)))
+
+    def _write_method_caller(self, method: SystemMethod, with_body: bool, output: Output):
+        parameter_types = self._parameter_types(method)
+        function = CtypeFieldFunctionPointer(return_type=method.return_type, parameter_types=parameter_types)
+        parameters = [self._mapper.declaration(function, "function")]
+        parameters += [self._mapper.declaration(typ, f"p{index}") for index, typ in enumerate(parameter_types)]
+        declaration = self._mapper.declaration(method.return_type, f"{method.name_in_library}({', '.join(parameters)})")
+        if not with_body:
+            output.write(f"{declaration};")
+            output.new_line()
+            return
+        arguments = ", ".join(f"p{index}" for index in range(len(parameter_types)))
+        call = f"function({arguments})"
+        if method.return_type != NamedCtypeFieldType("void"):
+            call = f"return {call}"
+        output.write(f"static {declaration} {{ {call}; }}")
+        output.new_line()
+
+
+class CffiSystemWriter(SystemWriter):
+    """
+    Writes the system with the same public API as the SystemWriter, but calling the functions of the library through
+    a compiled cffi module and accessing its globals with cffi. The module is built by running the written
+    <name>_cffi_build.py. It does not link the library, the system passes the addresses of the functions and globals
+    of the library it loaded, so several builds of a model can be used at the same time. The rate-monotonic step() of
+    multi-rate systems is written by the SystemWriter and calls the rates through the cffi functions.
+    """
+    __MODULE_IMPORT_LINES = ["from {0} import ffi, lib",
+                             "self.ffi = ffi",
+                             "self.lib = lib"]
+    __METHOD_VAR_INIT_PATTERN = "self.__{0} = functools.partial(lib.{1}, " \
+                                "ffi.cast(\"{2}\", ctypes.cast(self.dll.{1}, ctypes.c_void_p).value))"
+    __FIELD_VAR_INIT_PATTERN = "self.{0} = ffi.cast(\"{2}\", " \
+                               "ctypes.addressof(ctypes.c_char.in_dll(self.dll, \"{1}\")))"
+    __REFERENCE_FIELD_VAR_INIT_PATTERN = "self.{0} = ffi.cast(\"{2}\", " \
+                                         "ctypes.addressof(ctypes.c_char.in_dll(self.dll, \"{1}\")))[0]"
+    __BUILD_SCRIPT_LINES = ["import os",
+                            "import shutil",
+                            "import tempfile",
+                            "",
+                            "from cffi import FFI",
+                            "",
+                            "CDEF = \"\"\"",
+                            "{0}\"\"\"",
+                            "",
+                            "SOURCE = \"\"\"",
+                            "{1}\"\"\"",
+                            "",
+                            "ffibuilder = FFI()",
+                            "ffibuilder.cdef(CDEF)",
+                            "ffibuilder.set_source(\"{2}\", SOURCE)",
+                            "",
+                            "if __name__ == \"__main__\":",
+                            "    with tempfile.TemporaryDirectory() as build_directory:",
+                            "        module = ffibuilder.compile(tmpdir=build_directory)",
+                            "        shutil.move(module, os.path.join(os.path.dirname(os.path.abspath(__file__)),",
+                            "                                         os.path.basename(module)))",
+                            ""]
+
+    _cdef_mapper: CdefMapper = CdefMapper()
+    _cdef_writer: CdefWriter = CdefWriter(_cdef_mapper)
+    _elements: dict[str, Element] = {}
+
+    @staticmethod
+    def module_name(system: System) -> str:
+        return f"_{system.name.lower()}_cffi"
+
+    @staticmethod
+    def build_script_name(system: System) -> str:
+        return f"{system.name.lower()}_cffi_build.py"
+
+    def write(
+            self,
+            system: System,
+            output_path: str,
+            python_bindings_writer: PythonBindingWriter,
+            shared_binding_file: Optional[BindingFile] = None
+    ):
+        self._elements = {element.name: element
+                          for file in system.bindingFiles + ([] if shared_binding_file is None else [shared_binding_file])
+                          for element in file.elements}
+        super().write(replace(system, imports=system.imports + [Import(None, ["functools"])]),
+                      output_path,
+                      python_bindings_writer,
+                      shared_binding_file)
+        cdef = _StringOutput()
+        self._cdef_writer.write_cdef(system, cdef)
+        source = _StringOutput()
+        self._cdef_writer.write_source(system, source)
+        output = BufferedFileOutput(os.path.join(output_path, self.build_script_name(system)))
+        output.write("\n".join(self.__BUILD_SCRIPT_LINES).format(cdef.text, source.text, self.module_name(system)))
+        output.close()
+
+    def _write_loader_block(self, output: Output, system: System):
+        super()._write_loader_block(output, system)
+        for line in self.__MODULE_IMPORT_LINES:
+            output.write(line.format(self.module_name(system)))
+            output.new_line()
+
+    def _write_method_initializer(self, output: Output, method: SystemMethod):
+        output.write(self.__METHOD_VAR_INIT_PATTERN.format(
+            method.name,
+            method.name_in_library,
+            self._cdef_writer.function_pointer_type(method)
+        ))
+        output.new_line()
+
+    def _write_field_initializer(self, output: Output, field: SystemField):
+        # structs, arrays and pointers are dereferenced, which gives a cffi reference to the global like the ctypes
+        # objects of the SystemWriter. Dereferencing a primitive would copy its value, so it stays a pointer.
+        pattern = self.__REFERENCE_FIELD_VAR_INIT_PATTERN
+        if self._is_primitive(field.type):
+            pattern = self.__FIELD_VAR_INIT_PATTERN
+        output.write(pattern.format(field.name,
+                                    field.name_in_library,
+                                    self._cdef_mapper.declaration(CtypeFieldPointer(field.type))))
+        output.new_line()
+
+    def _is_primitive(self, typ: CtypeFieldType) -> bool:
+        while isinstance(typ, NamedCtypeFieldType) and isinstance(self._elements.get(typ.name), Definition):
+            typ = self._elements[typ.name].for_type
+        return isinstance(typ, NamedCtypeFieldType) and (typ.name not in self._elements or
+                                                         isinstance(self._elements[typ.name], Enum))
+
+
+class _StringOutput(Output):
+    __chunks: list[str]
+
+    def __init__(self):
+        self.__chunks = []
+
+    def write(self, text: str):
+        self.__chunks.append(text)
+
+    def new_line(self):
+        self.__chunks.append("\n")
+
+    @property
+    def text(self) -> str:
+        return "".join(self.__chunks)
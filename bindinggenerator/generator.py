@@ -1,4 +1,5 @@
-from dataclasses import replace
+import time
+from dataclasses import replace, dataclass
 from typing import Callable, TypeVar, Union
 
 import bindinggenerator.model
@@ -20,42 +21,65 @@ def _get_name_of_type(typ: CtypeFieldType) -> Optional[str]:
 
 class PythonCodeElementGraphCreator:
     already_resolved_dependencies: set[str] = set()
+    _elements_by_name: dict[str, list[Element]]
+    _recursive_direct_dependencies: dict[int, list[str]]
 
     def create(self, elements: list[Element]) -> list[Node]:
-        return [self._create_node(element, elements) for element in elements]
-
-    @staticmethod
-    def _get_elements_by_name(name: str, elements: list[Element]) -> list[Element]:
-        return list(filter(lambda it: it.name == name, elements))
-
-    def _get_recursive_direct_dependencies(self, element: Element, elements: list[Element]):
+        self._elements_by_name = {}
+        for element in elements:
+            self._elements_by_name.setdefault(element.name, []).append(element)
+        self._recursive_direct_dependencies = {}
+        return [self._create_node(element) for element in elements]
+
+    def _get_elements_by_name(self, name: str) -> list[Element]:
+        return self._elements_by_name.get(name, [])
+
+    def _get_recursive_direct_dependencies(self, element: Element) -> list[str]:
+        # typedef chains are followed in a loop, so long chains do not hit the recursion limit
+        definitions: list[Definition] = []
+        visited_definitions: set[int] = set()
+        dependencies = self._recursive_direct_dependencies.get(id(element))
+        while dependencies is None:
+            if isinstance(element, Definition):
+                if id(element) in visited_definitions:
+                    raise Exception(f"Circular type definition of {element.name}")
+                visited_definitions.add(id(element))
+                definitions.append(element)
+                aliased_element = self._get_aliased_element(element)
+                if aliased_element is None:
+                    dependencies = []
+                else:
+                    element = aliased_element
+                    dependencies = self._recursive_direct_dependencies.get(id(element))
+            else:
+                dependencies = self._get_direct_dependencies(element)
+                self._recursive_direct_dependencies[id(element)] = dependencies
+
+        for definition in reversed(definitions):
+            dependencies = [definition.name] + dependencies
+            self._recursive_direct_dependencies[id(definition)] = dependencies
+        return dependencies
+
+    def _get_aliased_element(self, definition: Definition) -> Optional[Element]:
+        direct_dependency = _get_name_of_type(definition.for_type)
+        if direct_dependency is None:
+            return None
+        found = self._get_elements_by_name(direct_dependency)
+        if len(found) == 0:
+            if direct_dependency not in self.already_resolved_dependencies:
+                raise Exception("Missing dependency already when building the graph")
+            return None
+        return found[0]
+
+    def _get_direct_dependencies(self, element: Element) -> list[str]:
         if isinstance(element, CtypeContainerElement):
             return [self._mark_as_direct_dependency_name(element.name)]
         elif isinstance(element, bindinggenerator.model.Enum):
             return []
-        elif isinstance(element, Definition):
-            direct_dependency = _get_name_of_type(element.for_type)
-            dependencies = [element.name]
-            if direct_dependency is not None:
-                found = self._get_elements_by_name(direct_dependency, elements)
-                if len(found) == 0:
-                    if direct_dependency not in self.already_resolved_dependencies:
-                        raise Exception("Missing dependency already when building the graph")
-                    else:
-                        # print(f"No element for {direct_dependency}, but it is already resolved")
-                        pass
-                else:
-                    dependencies += self._get_recursive_direct_dependencies(found[0], elements)
-
-            return dependencies
         else:
             raise Exception("Unhandled case")
 
-    def _create_node(
-            self,
-            element: Element,
-            elements: list[Element]
-    ) -> Node:
+    def _create_node(self, element: Element) -> Node:
         if isinstance(element, Definition):
             return Node(
                 keys=[element.name],
@@ -66,14 +90,15 @@ class PythonCodeElementGraphCreator:
             keys = [self._mark_as_direct_dependency_name(element.name)]
             dependencies = self._get_dependencies(element)
             direct_dependencies = self._get_direct_ctype_dependencies(element)
+            direct_dependency_names = set(direct_dependencies)
             dependencies = [dependency
                             for dependency in dependencies
-                            if dependency not in direct_dependencies and
+                            if dependency not in direct_dependency_names and
                             dependency not in self.already_resolved_dependencies]
             dependencies += [d
                              for dependency in direct_dependencies
-                             for element in self._get_elements_by_name(dependency, elements)
-                             for d in self._get_recursive_direct_dependencies(element, elements)]
+                             for element in self._get_elements_by_name(dependency)
+                             for d in self._get_recursive_direct_dependencies(element)]
             if not isinstance(element, CtypeContainer):
                 dependencies.append(element.name)
             else:
@@ -114,13 +139,29 @@ class PythonCodeElementGraphCreator:
                 for type_name in get_base_type_names(field.type)]
 
 
+@dataclass(frozen=True)
+class ArrangementStatistics:
+    sort_rounds: int
+    splits: int
+    additional_elements: int
+    duration: float
+
+
 class ElementArranger:
+    statistics: Optional[ArrangementStatistics] = None
+
     def arrange(
             self,
             elements: list[Element],
             external_dependency_names: list[str],
             resolve_circular_dependencies: bool = True
     ) -> list[Element]:
+        start = time.perf_counter()
+        if len(elements) == 0:
+            # like the bindings of a model whose types are all defined in a shared binding file
+            self.statistics = ArrangementStatistics(sort_rounds=0, splits=0, additional_elements=0,
+                                                    duration=time.perf_counter() - start)
+            return []
         sorter = TopologicalSorter()
         graph_creator = PythonCodeElementGraphCreator()
         resolved_dependencies = set(external_dependency_names)
@@ -129,24 +170,25 @@ class ElementArranger:
         graph = graph_creator.create(elements)
 
         sorted_nodes: list[Node] = []
+        sort_rounds = 0
         splits = 0
         additional_elements = 0
         while True:
             sorter_result = sorter.sort(graph)
+            sort_rounds += 1
             newly_sorted_nodes = self._flatten(sorter_result.sorted_list)
             sorted_nodes += newly_sorted_nodes
             if isinstance(sorter_result, CircularDependency):
                 if not resolve_circular_dependencies:
                     raise Exception("Circular dependency detected")
-                new_elements: list[Element] = [node.data for node in sorter_result.remaining_graph]
-                before = len(new_elements)
-                new_elements = self._split_one_element(new_elements)
-                splits += 1
-                additional_elements += len(new_elements) - before
                 resolved_dependencies = resolved_dependencies.union(self._flatten([node.keys
                                                                                    for node in newly_sorted_nodes]))
                 sorter.ignore_names = resolved_dependencies
                 graph_creator.already_resolved_dependencies = resolved_dependencies
+                before = len(sorter_result.remaining_graph)
+                new_elements, split_count = self._split_circular_dependencies(sorter_result.remaining_graph, sorter)
+                splits += split_count
+                additional_elements += len(new_elements) - before
                 graph = graph_creator.create(new_elements)
             elif isinstance(sorter_result, Sorted):
                 break
@@ -156,6 +198,12 @@ class ElementArranger:
         if len(ordered_elements) != len(elements) + additional_elements:
             raise Exception("Error while sorting elements had " +
                             f"{len(elements) + additional_elements} but now are {len(ordered_elements)}")
+        self.statistics = ArrangementStatistics(
+            sort_rounds=sort_rounds,
+            splits=splits,
+            additional_elements=additional_elements,
+            duration=time.perf_counter() - start
+        )
         return ordered_elements
 
     T = TypeVar('T')
@@ -164,6 +212,39 @@ class ElementArranger:
     def _flatten(list_in_list: list[list[T]]) -> list[T]:
         return [item for sublist in list_in_list for item in sublist]
 
+    def _split_circular_dependencies(
+            self,
+            graph: list[Node],
+            sorter: TopologicalSorter
+    ) -> tuple[list[Element], int]:
+        """Returns the elements with the elements to split replaced by their parts and the number of split elements."""
+        elements: list[Element] = [node.data for node in graph]
+        elements_to_split = [self._select_element_to_split(component)
+                             for component in sorter.find_circular_dependencies(graph)]
+        ids_to_split = set([id(element) for element in elements_to_split if element is not None])
+        if len(ids_to_split) == 0:
+            return self._split_one_element(elements), 1
+
+        splittable_elements = [element for element in elements if isinstance(element, SplittableElement)]
+        not_splittable_elements = [element for element in elements if not isinstance(element, SplittableElement)]
+        return not_splittable_elements + [split_element
+                                          for element in splittable_elements
+                                          for split_element in (element.split()
+                                                                if id(element) in ids_to_split
+                                                                else [element])], len(ids_to_split)
+
+    @staticmethod
+    def _select_element_to_split(component: list[Node]) -> Optional[Element]:
+        # Splitting an element only breaks the cycle, if other elements of the cycle depend on its declaration
+        dependency_names = set([dependency for node in component for dependency in node.dependencies])
+        splittable_elements = [node.data for node in component if isinstance(node.data, SplittableElement)]
+        for element in splittable_elements:
+            if element.name in dependency_names:
+                return element
+        if len(splittable_elements) > 0:
+            return splittable_elements[0]
+        return None
+
     def _split_one_element(self, elements: list[Element]) -> list[Element]:
         splittable_elements = [element for element in elements if isinstance(element, SplittableElement)]
         not_splittable_elements = [element for element in elements if not isinstance(element, SplittableElement)]
@@ -224,7 +305,8 @@ class PythonBindingFileGenerator:
         elements += [self._create_element_from_enum(enum) for enum in module.enums]
 
         containers = [self._add_container_name_prefix_to_inner_container(container) for container in module.container]
-        containers += [inner_container for container in containers for inner_container in container.inner_containers]
+        containers += [inner_container for container in containers
+                       for inner_container in self._inner_containers(container)]
         elements += [self._create_element_from_container(container) for container in containers]
 
         return BindingFile(
@@ -262,6 +344,11 @@ class PythonBindingFileGenerator:
         else:
             raise Exception(f"Unhandled type {typ}")
 
+    def _inner_containers(self, container: Container) -> list[Container]:
+        # inner containers can have inner containers, like the timing of the real time model of multi-rate models
+        return [nested for inner_container in container.inner_containers
+                for nested in [inner_container] + self._inner_containers(inner_container)]
+
     def _add_container_name_prefix_to_inner_container(self, container: Container) -> Container:
         old_inner_container_names: list[str] = [inner_struct.name for inner_struct in container.inner_containers]
         inner_containers: list[Container] = []
@@ -0,0 +1,173 @@
+import ctypes
+from dataclasses import dataclass
+from typing import Optional
+
+from bindinggenerator import primitive_names_to_ctypes
+from bindinggenerator.cdefmapper import CdefMapper
+from bindinggenerator.model import System, BindingFile, Element, Definition, Enum, CtypeContainerDefinition, \
+    CtypeContainerType, CtypeFieldType, NamedCtypeFieldType, CtypeFieldTypeArray, CtypeFieldPointer, \
+    CtypeFieldFunctionPointer
+
+
+@dataclass(frozen=True)
+class LayoutLeaf:
+    path: str
+    symbol: str
+    offset: int
+    type: str
+    element_size: int
+    shape: list[int]
+
+
+@dataclass(frozen=True)
+class LayoutSymbol:
+    name: str
+    symbol: str
+    type: str
+    size: int
+    alignment: int
+
+
+@dataclass(frozen=True)
+class Layout:
+    system: str
+    binary: str
+    pointer_size: int
+    total_size: int
+    symbols: list[LayoutSymbol]
+    leaves: list[LayoutLeaf]
+
+
+def _array_size(size) -> int:
+    # the sizes are the integer constants of the C code, like 3, 0x10 or 8U
+    literal = str(size).rstrip("uUlL")
+    if len(literal) > 1 and literal[0] == "0" and literal[1] not in "xXbB":
+        return int(literal, 8)
+    return int(literal, 0)
+
+
+class LayoutGenerator:
+    """
+    Computes the memory layout of the globals of a system with the layout rules ctypes uses for the host, which are
+    the ones the bindings use when they access the library.
+    """
+    _POINTER_TYPE = "pointer"
+    _ENUM_TYPE = "int"
+
+    _cdef_mapper: CdefMapper = CdefMapper()
+
+    def generate(self, system: System, shared_binding_file: Optional[BindingFile] = None) -> Layout:
+        binding_files = system.bindingFiles + ([] if shared_binding_file is None else [shared_binding_file])
+        elements: dict[str, Element] = {}
+        for element in [element for file in binding_files for element in file.elements]:
+            # a declaration of a container must not replace its definition
+            if not isinstance(element, CtypeContainerDefinition) and \
+                    isinstance(elements.get(element.name), CtypeContainerDefinition):
+                continue
+            elements[element.name] = element
+        resolver = _CtypeResolver(elements)
+        symbols = []
+        leaves = []
+        for field in system.fields:
+            ctype = resolver.ctype(field.type)
+            symbols.append(LayoutSymbol(name=field.name,
+                                        symbol=field.name_in_library,
+                                        type=self._type_name(field.type),
+                                        size=ctypes.sizeof(ctype),
+                                        alignment=ctypes.alignment(ctype)))
+            leaves += self._leaves(resolver, field.type, field.name, field.name_in_library, 0)
+        return Layout(system=system.name,
+                      binary=system.binary_basename,
+                      pointer_size=ctypes.sizeof(ctypes.c_void_p),
+                      total_size=sum(symbol.size for symbol in symbols),
+                      symbols=symbols,
+                      leaves=leaves)
+
+    def _leaves(
+            self,
+            resolver: "_CtypeResolver",
+            typ: CtypeFieldType,
+            path: str,
+            symbol: str,
+            offset: int
+    ) -> list[LayoutLeaf]:
+        resolved = resolver.resolve(typ)
+        if isinstance(resolved, CtypeFieldTypeArray):
+            shape = []
+            element = resolved
+            while isinstance(element, CtypeFieldTypeArray):
+                shape.append(_array_size(element.size))
+                element = resolver.resolve(element.of)
+            if isinstance(element, CtypeContainerDefinition):
+                # arrays of structs are listed element by element, arrays of values as one leaf with their shape
+                element_size = ctypes.sizeof(resolver.ctype(resolved.of))
+                return [leaf for index in range(_array_size(resolved.size))
+                        for leaf in self._leaves(resolver, resolved.of, f"{path}[{index}]", symbol,
+                                                 offset + index * element_size)]
+            return [self._leaf(resolver, element, path, symbol, offset, shape)]
+        elif isinstance(resolved, CtypeContainerDefinition):
+            container = resolver.ctype(typ)
+            return [leaf for field in resolved.properties
+                    for leaf in self._leaves(resolver, field.type, f"{path}.{field.name}", symbol,
+                                             offset + getattr(container, field.name).offset)]
+        return [self._leaf(resolver, resolved, path, symbol, offset, [])]
+
+    def _leaf(self, resolver: "_CtypeResolver", typ, path: str, symbol: str, offset: int, shape: list[int]):
+        return LayoutLeaf(path=path,
+                          symbol=symbol,
+                          offset=offset,
+                          type=self._type_name(typ),
+                          element_size=ctypes.sizeof(resolver.ctype(typ)),
+                          shape=shape)
+
+    def _type_name(self, typ) -> str:
+        if isinstance(typ, (CtypeFieldPointer, CtypeFieldFunctionPointer)):
+            return self._POINTER_TYPE
+        elif isinstance(typ, Enum):
+            return self._ENUM_TYPE
+        elif isinstance(typ, CtypeContainerDefinition):
+            return typ.name
+        return self._cdef_mapper.declaration(typ)
+
+
+class _CtypeResolver:
+    """Builds the ctypes types of the elements of the bindings, pointers are only needed for their size."""
+    __CONTAINER_BASES = {CtypeContainerType.STRUCT: ctypes.Structure, CtypeContainerType.UNION: ctypes.Union}
+
+    _elements: dict[str, Element]
+    _containers: dict[str, type]
+
+    def __init__(self, elements: dict[str, Element]):
+        self._elements = elements
+        self._containers = {}
+
+    def resolve(self, typ):
+        """Follows the type definitions to a primitive, array, pointer, enum or container."""
+        while isinstance(typ, NamedCtypeFieldType) and typ.name not in primitive_names_to_ctypes:
+            element = self._elements.get(typ.name)
+            if element is None:
+                raise Exception(f"No definition of {typ.name}")
+            typ = element.for_type if isinstance(element, Definition) else element
+        return typ
+
+    def ctype(self, typ) -> type:
+        resolved = self.resolve(typ)
+        if isinstance(resolved, NamedCtypeFieldType):
+            ctype = primitive_names_to_ctypes[resolved.name]
+            if ctype is None:
+                raise Exception(f"{resolved.name} has no size")
+            return ctype
+        elif isinstance(resolved, (CtypeFieldPointer, CtypeFieldFunctionPointer)):
+            return ctypes.c_void_p
+        elif isinstance(resolved, CtypeFieldTypeArray):
+            return self.ctype(resolved.of) * _array_size(resolved.size)
+        elif isinstance(resolved, Enum):
+            return ctypes.c_int
+        elif isinstance(resolved, CtypeContainerDefinition):
+            if resolved.name not in self._containers:
+                self._containers[resolved.name] = type(resolved.name,
+                                                       (self.__CONTAINER_BASES[resolved.container_type],),
+                                                       {"_fields_": [(field.name, self.ctype(field.type))
+                                                                     for field in resolved.properties]})
+            return self._containers[resolved.name]
+        raise Exception(f"Unhandled case {resolved}")
@@ -141,6 +141,8 @@ class System:
     methods: list[SystemMethod]
     fields: list[SystemField]
     bindingFiles: list[BindingFile]
+    # how many base ticks the rates of a multi-rate system, with a <model>_step<rate> function each, take
+    sample_time_ratios: Optional[list[int]] = None
 
 
 def get_base_types(typ: CtypeFieldType) -> list[CtypeFieldType]:
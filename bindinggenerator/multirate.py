@@ -0,0 +1,51 @@
+import os.path
+import re
+from typing import Optional
+
+# void model_step1(void)                 /* Sample time: [0.1s, 0.0s] */
+_SAMPLE_TIME_REGEX = r"\bvoid\s+{0}_step([0-9]+)\s*\(\s*(?:void)?\s*\)\s*/\*\s*Sample time:\s*" \
+                     r"\[\s*([0-9.eE+-]+)s\s*(?:,\s*([0-9.eE+-]+)s\s*)?]"
+# if ((model_M->Timing.TaskCounters.TID[1]) > 9) {/* Sample time: [0.1s, 0.0s] */
+_TASK_COUNTER_REGEX = r"TaskCounters\.TID\[([0-9]+)]\)*\s*>\s*([0-9]+)"
+
+
+def _ratios_from_sample_times(source: str, model: str) -> dict[int, int]:
+    sample_times = {}
+    for rate, time, offset in re.findall(_SAMPLE_TIME_REGEX.format(re.escape(model)), source):
+        if offset != "" and float(offset) != 0:
+            # the scheduler steps every rate in the ticks that are a multiple of its ratio, starting with the first
+            raise Exception(f"Rate {rate} of {model} has the sample time offset {offset}s, "
+                            f"the scheduler only supports rates without offset")
+        sample_times[int(rate)] = float(time)
+    base = sample_times.get(0)
+    if base is None or base <= 0:
+        return {}
+    ratios = {}
+    for rate, time in sample_times.items():
+        ratio = round(time / base)
+        if ratio < 1 or abs(ratio * base - time) > 1e-9 * max(time, 1):
+            raise Exception(f"The sample time {time}s of rate {rate} is no multiple of the base rate {base}s")
+        ratios[rate] = ratio
+    return ratios
+
+
+def _ratios_from_task_counters(source: str) -> dict[int, int]:
+    # the counter of a rate is reset once it exceeds the ratio minus one, the base rate has no counter
+    ratios = {int(rate): int(limit) + 1 for rate, limit in re.findall(_TASK_COUNTER_REGEX, source)}
+    return {0: 1, **ratios} if len(ratios) > 0 else {}
+
+
+def read_sample_time_ratios(header: str) -> Optional[dict[int, int]]:
+    """
+    Returns how many base ticks every rate of a multi-rate model takes, read from the model source next to its
+    header. Embedded Coder annotates the step functions with their sample times, older versions only show the
+    ratios in the counters of the rate scheduler. Returns None if the source has neither.
+    """
+    model = os.path.splitext(os.path.basename(header))[0]
+    source_file = os.path.join(os.path.dirname(header), f"{model}.c")
+    if not os.path.exists(source_file):
+        return None
+    with open(source_file, errors="ignore") as file:
+        source = file.read()
+    ratios = _ratios_from_sample_times(source, model) or _ratios_from_task_counters(source)
+    return ratios or None
@@ -0,0 +1,69 @@
+from astparser.model import Module
+from bindinggenerator import primitive_names
+from bindinggenerator.generator import PythonBindingFileGenerator, ElementArranger, AstTypeConverter
+from bindinggenerator.model import BindingFile, Element, Definition, CtypeContainerDefinition, Import, \
+    get_base_type_names
+
+
+class SharedBindingFileGenerator:
+    """
+    Collects the elements (type definitions, enums and containers) that are structurally identical in several modules,
+    so they can be defined once in a binding file shared by the bindings of all those modules.
+    """
+    minimum_occurrences: int = 2
+
+    def generate(
+            self,
+            modules: list[Module],
+            name: str,
+            binding_file_generator: PythonBindingFileGenerator = PythonBindingFileGenerator(),
+            element_arranger: ElementArranger = ElementArranger()
+    ) -> BindingFile:
+        binding_files = [binding_file_generator.generate(module, name, AstTypeConverter()) for module in modules]
+        shared_elements = self._find_shared_elements([binding_file.elements for binding_file in binding_files])
+        return BindingFile(
+            name=f"{name}.py",
+            imports=[Import(None, ["ctypes"]), Import("enum", ["Enum"])],
+            elements=element_arranger.arrange(shared_elements, primitive_names)
+        )
+
+    def _find_shared_elements(self, element_lists: list[list[Element]]) -> list[Element]:
+        elements_by_name: dict[str, list[list[Element]]] = {}
+        for elements in element_lists:
+            elements_of_module: dict[str, list[Element]] = {}
+            for element in elements:
+                elements_of_module.setdefault(element.name, []).append(element)
+            for element_name, named_elements in elements_of_module.items():
+                elements_by_name.setdefault(element_name, []).append(named_elements)
+
+        # A name is only shared if every module defining it, defines it the same way
+        shared: dict[str, list[Element]] = {
+            element_name: variants[0]
+            for element_name, variants in elements_by_name.items()
+            if len(variants) >= self.minimum_occurrences and all(variant == variants[0] for variant in variants)
+        }
+
+        # Shared elements must not depend on elements that are defined by the modules themselves
+        dependents: dict[str, set[str]] = {}
+        for element_name, elements in shared.items():
+            for element in elements:
+                for dependency in self._get_dependency_names(element):
+                    dependents.setdefault(dependency, set()).add(element_name)
+        not_shared = [dependency for dependency in dependents
+                      if dependency not in shared and dependency not in primitive_names]
+        while len(not_shared) > 0:
+            dependency = not_shared.pop()
+            for dependent in dependents.get(dependency, set()):
+                if dependent in shared:
+                    del shared[dependent]
+                    not_shared.append(dependent)
+
+        return [element for elements in shared.values() for element in elements]
+
+    @staticmethod
+    def _get_dependency_names(element: Element) -> list[str]:
+        if isinstance(element, Definition):
+            return get_base_type_names(element.for_type)
+        elif isinstance(element, CtypeContainerDefinition):
+            return [type_name for property in element.properties for type_name in get_base_type_names(property.type)]
+        return []
@@ -5,16 +5,19 @@ from typing import Optional
 from astparser.model import Module, Method as AstMethod, Field as AstField
 from bindinggenerator import primitive_names
 from bindinggenerator.generator import PythonBindingFileGenerator, ElementArranger, AstTypeConverter
-from bindinggenerator.model import SystemMethod, SystemField, Parameter, System, Import
+from bindinggenerator.model import SystemMethod, SystemField, Parameter, System, Import, BindingFile
 
 
 class SystemGenerator:
     __INITIALIZER_METHOD_NAME_REGEX = "(.*)_initialize"
     __STEP_METHOD_NAME_REGEX = "(.*)_step"
+    # multi-tasking exports of multi-rate models have a step function for every rate
+    __RATE_STEP_METHOD_NAME_REGEX = "(.*)_step([0-9]+)"
     __TERMINATOR_METHOD_NAME_REGEX = "(.*)_terminate"
     __LIFE_CYCLE_METHOD_NAME_REGEXES = [
         __INITIALIZER_METHOD_NAME_REGEX,
         __STEP_METHOD_NAME_REGEX,
+        __RATE_STEP_METHOD_NAME_REGEX,
         __TERMINATOR_METHOD_NAME_REGEX
     ]
     __OUTPUTS_FIELD_REGEX_PATTERN = "{0}_Y"
@@ -34,7 +37,10 @@ class SystemGenerator:
             name: str,
             binary_basename: str,
             binding_file_generator: PythonBindingFileGenerator = PythonBindingFileGenerator(),
-            element_arranger: ElementArranger = ElementArranger()
+            element_arranger: ElementArranger = ElementArranger(),
+            bindings_name: str = "bindings",
+            shared_binding_file: Optional[BindingFile] = None,
+            sample_time_ratios: Optional[dict[int, int]] = None
     ):
         ast_type_converter = AstTypeConverter()
         methods = module.methods
@@ -53,11 +59,28 @@ class SystemGenerator:
             )
             for method in life_cycle_methods]
 
+        rates = sorted(int(re.fullmatch(self.__RATE_STEP_METHOD_NAME_REGEX, method.name).group(2))
+                       for method in life_cycle_methods
+                       if re.fullmatch(self.__RATE_STEP_METHOD_NAME_REGEX, method.name) is not None)
+        rate_ratios = None
+        if len(rates) > 0:
+            rate_ratios = self._rate_ratios(name, rates, sample_time_ratios or {})
+
         system_fields = self._get_system_fields(module.fields, simulink_system_name, ast_type_converter)
 
         # Generate bindings file
-        binding_file = binding_file_generator.generate(module, "bindings", ast_type_converter)
-        arranged_elements = element_arranger.arrange(binding_file.elements, primitive_names)
+        binding_file = binding_file_generator.generate(module, bindings_name, ast_type_converter)
+        external_dependency_names = set(primitive_names)
+        if shared_binding_file is not None:
+            # Elements of the shared binding file are imported instead of being defined again
+            shared_names = set([element.name for element in shared_binding_file.elements])
+            binding_file = replace(
+                binding_file,
+                imports=binding_file.imports + [Import(shared_binding_file.name.removesuffix(".py"), ["*"])],
+                elements=[element for element in binding_file.elements if element.name not in shared_names]
+            )
+            external_dependency_names.update(shared_names)
+        arranged_elements = element_arranger.arrange(binding_file.elements, list(external_dependency_names))
         binding_file = replace(binding_file, elements=arranged_elements)
 
         return System(
@@ -67,9 +90,26 @@ class SystemGenerator:
                      Import(None, imports=["platform"])],
             methods=system_methods,
             fields=system_fields,
-            bindingFiles=[binding_file]
+            bindingFiles=[binding_file],
+            sample_time_ratios=rate_ratios
         )
 
+    @staticmethod
+    def _rate_ratios(name: str, rates: list[int], sample_time_ratios: dict[int, int]) -> Optional[list[int]]:
+        # without the ratios the step functions of the rates are still bound, only the scheduler is left out
+        if rates != list(range(len(rates))):
+            print(f"The step functions of {name} are not numbered from 0, but {rates}, no step() is generated")
+            return None
+        missing = [rate for rate in rates if rate not in sample_time_ratios]
+        if len(missing) > 0:
+            print(f"The sample time ratios of the rates {missing} of {name} are unknown, no step() is generated. "
+                  f"They can be given with --sample-time-ratios.")
+            return None
+        ratios = [sample_time_ratios[rate] for rate in rates]
+        if ratios[0] != 1 or any(ratio < 1 for ratio in ratios):
+            raise Exception(f"Invalid sample time ratios {ratios} of {name}, the base rate has to have the ratio 1")
+        return ratios
+
     def _get_system_fields(
             self,
             fields: list[AstField],
@@ -1,8 +1,13 @@
 import ctypes
+import json
 import os.path
-from typing import IO
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import IO, Optional
 
 from bindinggenerator import primitive_names_to_ctypes
+from bindinggenerator.layout import LayoutGenerator
 from bindinggenerator.model import BindingFile, Import, Element, Definition, Enum, CtypeContainer, \
     CtypeContainerDeclaration, CtypeContainerDefinition, CtypeFieldPointer, CtypeFieldType, NamedCtypeFieldType, \
     CtypeFieldTypeArray, CtypeFieldFunctionPointer, CtypeContainerProperty, System, SystemMethod, SystemField, \
@@ -36,15 +41,44 @@ class FileOutput(Output):
         self.__file.close()
 
 
+class BufferedFileOutput(Output):
+    """Collects the written text in memory and atomically replaces the file with it on close."""
+    __file: str
+    __chunks: list[str]
+
+    def __init__(self, file: str):
+        self.__file = file
+        self.__chunks = []
+
+    def write(self, text: str):
+        self.__chunks.append(text)
+
+    def new_line(self):
+        self.__chunks.append("\n")
+
+    def close(self):
+        temporary_file = f"{self.__file}.tmp"
+        try:
+            with open(temporary_file, "w") as file:
+                file.write("".join(self.__chunks))
+            os.replace(temporary_file, self.__file)
+        finally:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+        self.__chunks = []
+
+
 class IndentableOutput(Output):
     __output: Output
     __needs_indent: bool = False
     indent_pattern: str
     __indent_depth: int = 0
+    __indents: dict[int, str]
 
     def __init__(self, output: Output, indent: str):
         self.__output = output
         self.indent_pattern = indent
+        self.__indents = {}
 
     def indent(self, by: int = 1):
         self.__indent_depth += by
@@ -75,8 +109,13 @@ class IndentableOutput(Output):
         self.__output.close()
 
     def _do_indent(self):
-        for x in range(self.__indent_depth):
-            self.__output.write(self.indent_pattern)
+        if self.__indent_depth <= 0:
+            return
+        indent = self.__indents.get(self.__indent_depth)
+        if indent is None:
+            indent = self.indent_pattern * self.__indent_depth
+            self.__indents[self.__indent_depth] = indent
+        self.__output.write(indent)
 
 
 def _ctype_to_string(ctype) -> str:
@@ -148,8 +187,8 @@ class BaseWriter:
         output.new_line()
 
     def _write_indent(self, output: Output, count: int):
-        for i in range(count):
-            output.write(self._INDENT)
+        if count > 0:
+            output.write(self._INDENT * count)
 
 
 class PythonBindingWriter(BaseWriter):
@@ -279,8 +318,12 @@ class PythonBindingWriter(BaseWriter):
 
 class SystemWriter(BaseWriter):
     __CLASS_PATTERN = "class {0}:"
-    __INIT_METHOD_START_PATTERN = "def __init__(self, model=\"{0}\"):"
-    __LOADER_BLOCK_LINES = ["self.model = model",
+    __INIT_METHOD_START_PATTERN = "def __init__(self, model=\"{0}\", build_profile=None):"
+    __LOADER_BLOCK_LINES = ["""if build_profile is None:""",
+                            """    build_profile = os.environ.get("SLIMPYB_BUILD_PROFILE")""",
+                            """if build_profile and build_profile != "release":""",
+                            '''    model = f"{model}_{build_profile}"''',
+                            "self.model = model",
                             """directory = os.path.dirname(__file__)""",
                             """if platform.system() == "Linux":""",
                             """    self.dll_path = os.path.join(directory, f"{model}.so")""",
@@ -298,25 +341,67 @@ class SystemWriter(BaseWriter):
     __FIELD_VAR_INIT_PATTERN = """self.{0} = {2}.in_dll(self.dll, "{1}")"""
     __METHOD_START_PATTERN = "def {0}(self):"
     __METHOD_CALLING_CMETHOD_CONTENT = "self.__{0}()"
+    __STEP_FUNCTION_ADDRESSES_PATTERN = "self.step_function_addresses = [ctypes.cast(getattr(self.dll, name), " \
+                                        "ctypes.c_void_p).value for name in {0}]"
+    __RATE_STEP_METHOD_NAME_REGEX = "step([0-9]+)"
+    __SCHEDULER_INIT_LINES = ["self.sample_time_ratios = {0}",
+                              "self.tick = 0"]
+    __SCHEDULER_COMMENT = "# one base tick, the rates that are due are stepped from the fastest to the slowest"
+    __SCHEDULER_RATE_PATTERN = "if self.tick % {1} == 0:\n    self.__step{0}()"
 
     def write(
             self,
             system: System,
             output_path: str,
-            python_bindings_writer: PythonBindingWriter
+            python_bindings_writer: PythonBindingWriter,
+            shared_binding_file: Optional[BindingFile] = None
     ):
         binding_imports = []
         for binding in system.bindingFiles:
             name_without_extension = binding.name[:binding.name.rfind(".")]
             binding_imports.append(Import(name_without_extension, ["*"]))
-            output = FileOutput(os.path.join(output_path, binding.name))
-            python_bindings_writer.write(binding, output)
-            output.close()
 
-        output = IndentableOutput(FileOutput(os.path.join(output_path, f"{system.name.lower()}.py")), self._INDENT)
+        # The files do not depend on each other, so they can be written at the same time
+        with ThreadPoolExecutor() as executor:
+            futures = [executor.submit(self._write_binding_file, binding, output_path, python_bindings_writer)
+                       for binding in system.bindingFiles]
+            futures.append(executor.submit(self._write_system_file, system, binding_imports, output_path))
+            futures.append(executor.submit(self._write_exports_file, system, output_path))
+            futures.append(executor.submit(self._write_layout_file, system, output_path, shared_binding_file))
+            for future in futures:
+                future.result()
+
+    @staticmethod
+    def _write_binding_file(binding: BindingFile, output_path: str, python_bindings_writer: PythonBindingWriter):
+        output = BufferedFileOutput(os.path.join(output_path, binding.name))
+        python_bindings_writer.write(binding, output)
+        output.close()
+
+    def _write_system_file(self, system: System, binding_imports: list[Import], output_path: str):
+        output = IndentableOutput(BufferedFileOutput(os.path.join(output_path, f"{system.name.lower()}.py")),
+                                  self._INDENT)
         self._write_actual_system(system, binding_imports, output)
         output.close()
 
+    @staticmethod
+    def _write_exports_file(system: System, output_path: str):
+        # the symbols the system binds, only these are exported by the compiled library
+        output = BufferedFileOutput(os.path.join(output_path, f"{system.binary_basename}.exports"))
+        for name in sorted(set([method.name_in_library for method in system.methods] +
+                               [field.name_in_library for field in system.fields])):
+            output.write(name)
+            output.new_line()
+        output.close()
+
+    @staticmethod
+    def _write_layout_file(system: System, output_path: str, shared_binding_file: Optional[BindingFile]):
+        # the layout of the globals, for tools reading the memory of the library without the bindings
+        layout = LayoutGenerator().generate(system, shared_binding_file)
+        output = BufferedFileOutput(os.path.join(output_path, f"{system.binary_basename}.layout.json"))
+        output.write(json.dumps(asdict(layout), indent=2))
+        output.new_line()
+        output.close()
+
     def _write_actual_system(self, system: System, binding_imports: list[Import], output: IndentableOutput):
         for imprt in system.imports + binding_imports:
             self._write_import(imprt, output)
@@ -328,6 +413,8 @@ class SystemWriter(BaseWriter):
         output.new_line()
         output.deindent()
         self._write_methods(output, system.methods)
+        if system.sample_time_ratios is not None:
+            self._write_scheduler(output, system.sample_time_ratios)
 
     def _write_class_start(self, output: Output, name: str):
         output.write(self.__CLASS_PATTERN.format(name))
@@ -337,17 +424,25 @@ class SystemWriter(BaseWriter):
         output.write(self.__INIT_METHOD_START_PATTERN.format(system.binary_basename))
         output.new_line()
         output.indent()
-        self._write_loader_block(output)
+        self._write_loader_block(output, system)
         output.new_line()
         output.write("# System method initializers")
         output.new_line()
         self._write_method_initializers(output, system.methods)
+        self._write_step_function_addresses(output, system.methods)
         output.new_line()
         output.write("# System field initializers")
         output.new_line()
         self._write_field_initializers(output, system.fields)
+        if system.sample_time_ratios is not None:
+            output.new_line()
+            output.write("# Rate-monotonic scheduler")
+            output.new_line()
+            for line in self.__SCHEDULER_INIT_LINES:
+                output.write(line.format(system.sample_time_ratios))
+                output.new_line()
 
-    def _write_loader_block(self, output: Output):
+    def _write_loader_block(self, output: Output, system: System):
         for line in self.__LOADER_BLOCK_LINES:
             output.write(line)
             output.new_line()
@@ -360,6 +455,19 @@ class SystemWriter(BaseWriter):
         output.write(self.__METHOD_VAR_INIT_PATTERN.format(method.name, method.name_in_library))
         output.new_line()
 
+    def _write_step_function_addresses(self, output: Output, methods: list[SystemMethod]):
+        # native schedulers, like the co-simulation, call the step functions, one per rate, by their address
+        steps = [method for method in methods if method.name == "step"]
+        rate_steps: dict[int, SystemMethod] = {}
+        for method in methods:
+            match = re.fullmatch(self.__RATE_STEP_METHOD_NAME_REGEX, method.name)
+            if match is not None:
+                rate_steps[int(match.group(1))] = method
+        if len(rate_steps) > 0:
+            steps = [rate_steps[rate] for rate in sorted(rate_steps)]
+        output.write(self.__STEP_FUNCTION_ADDRESSES_PATTERN.format([method.name_in_library for method in steps]))
+        output.new_line()
+
     def _write_field_initializers(self, output: Output, fields: list[SystemField]):
         for field in fields:
             self._write_field_initializer(output, field)
@@ -379,6 +487,24 @@ class SystemWriter(BaseWriter):
             output.new_line()
             output.set_indent(indent)
 
+    def _write_scheduler(self, output: IndentableOutput, sample_time_ratios: list[int]):
+        indent = output.get_indent()
+        output.write(self.__METHOD_START_PATTERN.format("step"))
+        output.new_line()
+        output.indent()
+        output.write(self.__SCHEDULER_COMMENT)
+        output.new_line()
+        output.write(self.__METHOD_CALLING_CMETHOD_CONTENT.format("step0"))
+        output.new_line()
+        for rate, ratio in enumerate(sample_time_ratios[1:], start=1):
+            for line in self.__SCHEDULER_RATE_PATTERN.format(rate, ratio).split("\n"):
+                output.write(line)
+                output.new_line()
+        output.write("self.tick += 1")
+        output.new_line()
+        output.new_line()
+        output.set_indent(indent)
+
     def __write_method(self, output: IndentableOutput, method: SystemMethod):
         # TODO we ignore parameters and return types
         output.write(self.__METHOD_START_PATTERN.format(method.name))
@@ -0,0 +1,215 @@
+import ctypes
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from librarycompiler.nativelibrary import load_native_library
+
+_NATIVE_DIRECTORY = os.path.join(os.path.dirname(__file__), "native")
+_LIBRARY_NAME = "cosimulation"
+_PATH_PART_PATTERN = re.compile(r"^(\w+)((?:\[\d+])*)$")
+_VALUE_TYPES = (ctypes.c_bool, ctypes.c_char, ctypes.c_wchar, ctypes.c_byte, ctypes.c_ubyte, ctypes.c_short,
+                ctypes.c_ushort, ctypes.c_int, ctypes.c_uint, ctypes.c_long, ctypes.c_ulong, ctypes.c_longlong,
+                ctypes.c_ulonglong, ctypes.c_float, ctypes.c_double, ctypes.c_longdouble)
+
+
+@dataclass(frozen=True)
+class Connection:
+    """Wires the value at the source path to the destination path, paths are like "plant.outputs.a.n[1]"."""
+    source: str
+    destination: str
+
+
+@dataclass(frozen=True)
+class Location:
+    system: str
+    address: int
+    size: int
+    type: type
+
+
+@dataclass(frozen=True)
+class Copy:
+    source: int
+    destination: int
+    size: int
+
+
+class _Copy(ctypes.Structure):
+    _fields_ = [("source", ctypes.c_void_p), ("destination", ctypes.c_void_p), ("size", ctypes.c_size_t)]
+
+
+def _load_runner() -> ctypes.CDLL:
+    library = load_native_library(_NATIVE_DIRECTORY, _LIBRARY_NAME)
+    library.cosimulation_run.restype = None
+    library.cosimulation_run.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.POINTER(ctypes.c_int64),
+                                         ctypes.c_size_t, ctypes.POINTER(_Copy), ctypes.POINTER(ctypes.c_size_t),
+                                         ctypes.c_int64, ctypes.c_int64]
+    return library
+
+
+def _step_functions(name: str, system) -> list[tuple[int, int]]:
+    """Returns the address and the period in base ticks of the step function of every rate of the system."""
+    addresses = getattr(system, "step_function_addresses", None)
+    if addresses is None or len(addresses) == 0:
+        raise Exception(f"The system {name} has no step function addresses, its bindings have to be generated again")
+    ratios = getattr(system, "sample_time_ratios", None)
+    if ratios is None:
+        if len(addresses) > 1:
+            raise Exception(f"The sample time ratios of the rates of the system {name} are unknown")
+        ratios = [1]
+    return list(zip(addresses, ratios))
+
+
+def is_pointer_type(typ: type) -> bool:
+    """Whether values of the ctypes type are pointers, including function pointers."""
+    if issubclass(typ, (ctypes.Structure, ctypes.Union, ctypes.Array) + _VALUE_TYPES):
+        return False
+    return ctypes.sizeof(typ) == ctypes.sizeof(ctypes.c_void_p)
+
+
+def is_value_type(typ: type) -> bool:
+    """Whether the ctypes type is a number, a boolean or a character."""
+    return issubclass(typ, _VALUE_TYPES)
+
+
+def _element_type(typ: type) -> type:
+    while issubclass(typ, ctypes.Array):
+        typ = typ._type_
+    return typ
+
+
+def locate(system, path: str) -> tuple[int, type]:
+    """Returns the address and ctypes type of the value at the path in the system, like "outputs.a.n[1]"."""
+    name, *parts = path.split(".")
+    root = getattr(system, name, None)
+    if not isinstance(root, (ctypes.Structure, ctypes.Union)):
+        raise Exception(f"{name} is no struct of the system in {path}")
+    address = ctypes.addressof(root)
+    typ = type(root)
+    for part in parts:
+        match = _PATH_PART_PATTERN.match(part)
+        if match is None:
+            raise Exception(f"Invalid part {part} in {path}")
+        field_name, indices = match.groups()
+        fields = dict((field[0], field[1]) for field in getattr(typ, "_fields_", []))
+        if field_name not in fields:
+            raise Exception(f"{typ.__name__} has no field {field_name} in {path}")
+        address += getattr(typ, field_name).offset
+        typ = fields[field_name]
+        for index in re.findall(r"\[(\d+)]", indices):
+            if not issubclass(typ, ctypes.Array) or int(index) >= typ._length_:
+                raise Exception(f"Invalid index {index} of {field_name} in {path}")
+            address += int(index) * ctypes.sizeof(typ._type_)
+            typ = typ._type_
+    return address, typ
+
+
+def resolve(systems: dict[str, object], path: str) -> Location:
+    """Returns the address, size and ctypes type of the value at the path, like "plant.outputs.a.n[1]"."""
+    name, _, system_path = path.partition(".")
+    if name not in systems:
+        raise Exception(f"Unknown system {name} in {path}")
+    if system_path == "":
+        raise Exception(f"The path {path} does not name a field of the system")
+    address, typ = locate(systems[name], system_path)
+    return Location(system=name, address=address, size=ctypes.sizeof(typ), type=typ)
+
+
+def _check_compatible(connection: Connection, source: Location, destination: Location):
+    if source.size != destination.size or _element_type(source.type) != _element_type(destination.type):
+        raise Exception(f"Cannot wire {connection.source} of type {source.type.__name__} to "
+                        f"{connection.destination} of type {destination.type.__name__}")
+
+
+def _merge(copies: list[Copy]) -> list[Copy]:
+    # neighbouring fields wired to neighbouring fields, like the fields of a wired struct, are copied at once
+    merged: list[Copy] = []
+    for copy in sorted(copies, key=lambda it: it.destination):
+        if len(merged) > 0:
+            last = merged[-1]
+            if copy.destination < last.destination + last.size:
+                raise Exception(f"Several connections write to the address {copy.destination:#x}")
+            if last.destination + last.size == copy.destination and last.source + last.size == copy.source:
+                merged[-1] = Copy(source=last.source, destination=last.destination, size=last.size + copy.size)
+                continue
+        merged.append(copy)
+    return merged
+
+
+class CoSimulation:
+    """
+    Runs several generated systems with their outputs wired to the inputs of others. The wiring is resolved to byte
+    copies once, the steps and copies of many ticks run in native code. A system with a period of n is stepped every
+    n base ticks. In a tick the systems are stepped in the order they were given, so a system reads the outputs
+    its predecessors wrote in the same tick and the outputs of its successors of the previous tick. The rates of a
+    multi-rate system are stepped after each other, from the fastest to the slowest, every period times their sample
+    time ratio ticks.
+    """
+    tick: int
+    copies: dict[str, list[Copy]]
+
+    def __init__(
+            self,
+            systems: dict[str, object],
+            wiring: list[Connection],
+            periods: Optional[dict[str, int]] = None
+    ):
+        periods = periods or {}
+        for name in periods:
+            if name not in systems:
+                raise Exception(f"Unknown system {name} in the periods")
+            if periods[name] < 1:
+                raise Exception(f"The period of {name} has to be at least one tick")
+        handles = [getattr(system, "dll")._handle for system in systems.values()]
+        if len(set(handles)) != len(handles):
+            raise Exception("Several systems share a loaded library and with it their globals")
+        self._runner = _load_runner()
+        self.tick = 0
+        self.copies = {name: [] for name in systems}
+        for connection in wiring:
+            source = resolve(systems, connection.source)
+            destination = resolve(systems, connection.destination)
+            _check_compatible(connection, source, destination)
+            self.copies[destination.system].append(Copy(source=source.address,
+                                                        destination=destination.address,
+                                                        size=source.size))
+        self.copies = {name: _merge(copies) for name, copies in self.copies.items()}
+
+        # every rate is run like a system of its own, the inputs are copied before the base rate is stepped
+        steps = []
+        step_periods = []
+        copies = []
+        copy_starts = [0]
+        for name, system in systems.items():
+            for rate, (function, ratio) in enumerate(_step_functions(name, system)):
+                steps.append(function)
+                step_periods.append(periods.get(name, 1) * ratio)
+                if rate == 0:
+                    copies += self.copies[name]
+                copy_starts.append(len(copies))
+        self._steps = (ctypes.c_void_p * len(steps))(*steps)
+        self._periods = (ctypes.c_int64 * len(steps))(*step_periods)
+        self._copies = (_Copy * max(len(copies), 1))(*[(copy.source, copy.destination, copy.size) for copy in copies])
+        self._copy_starts = (ctypes.c_size_t * len(copy_starts))(*copy_starts)
+        # keeps the systems, and with them their libraries, loaded as long as the addresses are used
+        self._systems = dict(systems)
+
+    def run(self, ticks: int):
+        """Runs the given number of base ticks."""
+        self._runner.cosimulation_run(self._steps, self._periods, len(self._steps), self._copies,
+                                      self._copy_starts, self.tick, ticks)
+        self.tick += ticks
+
+
+def run(system, ticks: int):
+    """
+    Runs the rate-monotonic schedule of a multi-rate system, or the steps of a single-rate one, for the given number
+    of base ticks in native code. Continues the schedule at the tick of the step() of the system.
+    """
+    simulation = CoSimulation({"system": system}, [])
+    simulation.tick = getattr(system, "tick", 0)
+    simulation.run(ticks)
+    if hasattr(system, "tick"):
+        system.tick = simulation.tick
@@ -0,0 +1,38 @@
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+typedef void (*cosimulation_step)(void);
+
+typedef struct {
+    const void *source;
+    void *destination;
+    size_t size;
+} cosimulation_copy;
+
+/*
+ * Runs the models for the base ticks [start_tick, start_tick + ticks). In every tick the models are run in their
+ * order, a model is only run in ticks which are a multiple of its period. Running a model copies its wired inputs,
+ * copies[copy_starts[model]] to copies[copy_starts[model + 1]], and then calls its step function.
+ */
+void cosimulation_run(
+        const cosimulation_step *steps,
+        const int64_t *periods,
+        size_t model_count,
+        const cosimulation_copy *copies,
+        const size_t *copy_starts,
+        int64_t start_tick,
+        int64_t ticks
+) {
+    for (int64_t tick = start_tick; tick < start_tick + ticks; tick++) {
+        for (size_t model = 0; model < model_count; model++) {
+            if (tick % periods[model] != 0) {
+                continue;
+            }
+            for (size_t copy = copy_starts[model]; copy < copy_starts[model + 1]; copy++) {
+                memcpy(copies[copy].destination, copies[copy].source, copies[copy].size);
+            }
+            steps[model]();
+        }
+    }
+}
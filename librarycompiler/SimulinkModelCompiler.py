@@ -1,9 +1,19 @@
 import os
+import platform as host
+import shutil
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from os.path import join
 from shutil import copyfile
+from typing import Optional
+
+from librarycompiler.buildcache import BuildCache
+from librarycompiler.buildprofile import BuildProfile, RELEASE
+from librarycompiler.telemetry import PlatformTelemetry, read_timing_log
 
 
 class Platform(Enum):
@@ -13,13 +23,65 @@ class Platform(Enum):
 
 
 class SimulinkModelCompiler:
-    _BASE_COMMAND = "docker run --rm -v \"{1}\":/output -v \"{0}\":/workdir -e CROSS_TRIPLE={2}  multiarch/crossbuild" \
-                    " make -f \"{5}\" \"{3}\" \"name={4}\" output_dir=\"/output\""
+    _DOCKER_IMAGE = "multiarch/crossbuild"
+    _BASE_COMMAND = "docker run --rm -v \"{1}\":/output -v \"{0}\":/workdir -e CROSS_TRIPLE={2}  " + _DOCKER_IMAGE + \
+                    " make -j{8} -f \"{5}\" \"{3}\" \"name={4}\" output_dir=\"/output\" build_dir=\"{7}\"" \
+                    " CFLAGS=\"{9}\"{10}"
+    _NATIVE_COMMAND = "make -j{8} -f \"{5}\" \"{3}\" \"name={4}\" output_dir=\"{1}\" build_dir=\"{7}\"" \
+                      " CFLAGS=\"{9}\" CC=\"{6}\"{10}"
+    # objects are kept between builds, so only changed sources are compiled again
+    _BUILD_DIRECTORY = ".slimpyb_build"
+    _NATIVE_COMPILERS = ["cc", "gcc", "clang"]
+    _HOST_PLATFORMS = {"Linux": Platform.LINUX, "Darwin": Platform.MAC, "Windows": Platform.WINDOWS}
+    _HOST_MACHINES = ["x86_64", "AMD64"]
     _MAKE_FILE = os.path.join(os.path.dirname(__file__), 'Makefile')
+    _TIMED_COMMAND = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'timedcommand.py')
+    _TIMED_COMMAND_SHELL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'timedcommand.sh')
+    _TIMING_LOG = "timing.log"
     _MAKEFILE_NAME = ""
+    _PLATFORMS = [Platform.LINUX, Platform.MAC, Platform.WINDOWS]
+    _max_workers: Optional[int] = None
+    _force_docker: bool = False
+    _cache: Optional[BuildCache] = None
+    _make_jobs: int = 1
+    _profile: BuildProfile = RELEASE
+    _exports: Optional[str] = None
+    _gc_sections: bool = False
+    _strip: bool = False
+    _record_telemetry: bool = False
+    telemetry: list[PlatformTelemetry]
 
-    def __init__(self, makefile_name: str = "Makefile"):
+    def __init__(
+            self,
+            makefile_name: str = "Makefile",
+            max_workers: Optional[int] = None,
+            force_docker: bool = False,
+            cache: Optional[BuildCache] = None,
+            make_jobs: Optional[int] = None,
+            profile: BuildProfile = RELEASE,
+            exports: Optional[str] = None,
+            gc_sections: bool = False,
+            strip: bool = False,
+            record_telemetry: bool = False
+    ):
+        """
+        exports is a file with one symbol per line, as written by the SystemWriter. If it is given, the libraries only
+        export these symbols. strip is ignored for profiles with debug information. With record_telemetry, the compile
+        time of every translation unit, the link time and the total time of every platform are added to telemetry.
+        """
         self._MAKEFILE_NAME = makefile_name
+        self._max_workers = max_workers
+        self._force_docker = force_docker
+        self._cache = cache
+        self._make_jobs = make_jobs or os.cpu_count() or 1
+        self._profile = profile
+        self._exports = exports
+        self._gc_sections = gc_sections
+        if strip and profile.debug_info:
+            print(f"The {profile.name} binaries are not stripped, they keep their debug information")
+        self._strip = strip and not profile.debug_info
+        self._record_telemetry = record_telemetry
+        self.telemetry = []
 
     @staticmethod
     def _library_extension_for_platform(platform: Platform) -> str:
@@ -43,22 +105,214 @@ class SimulinkModelCompiler:
         else:
             raise Exception("Unknown platform")
 
-    def _setup(self, path: str):
-        self.place_makefile(path)
+    def _native_compiler(self) -> Optional[str]:
+        compiler = os.environ.get("CC")
+        if compiler is not None:
+            return compiler
+        for compiler in self._NATIVE_COMPILERS:
+            if shutil.which(compiler) is not None:
+                return compiler
+        return None
+
+    def native_compiler_for_platform(self, platform: Platform) -> Optional[str]:
+        """
+        Returns the local compiler if the host can build the platform itself, otherwise None.
+        The docker image builds for x86_64, so only x86_64 hosts build their own platform natively.
+        """
+        if self._force_docker:
+            return None
+        if self._HOST_PLATFORMS.get(host.system()) != platform or host.machine() not in self._HOST_MACHINES:
+            return None
+        if shutil.which("make") is None:
+            return None
+        return self._native_compiler()
+
+    def _compiler_identity(self, platform: Platform) -> str:
+        native_compiler = self.native_compiler_for_platform(platform)
+        if native_compiler is None:
+            command = f"docker image inspect --format \"{{{{.Id}}}}\" {self._DOCKER_IMAGE}"
+            name = self._DOCKER_IMAGE
+        else:
+            command = f"{native_compiler} --version"
+            name = native_compiler
+        result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return f"{name}\n{result.stdout}"
+
+    def native_platform(self) -> Optional[Platform]:
+        """Returns the platform the host builds natively, if there is one."""
+        for platform in self._PLATFORMS:
+            if self.native_compiler_for_platform(platform) is not None:
+                return platform
+        return None
+
+    def build_directory(self, path: str, platform: Platform) -> str:
+        """Returns the directory the objects of the platform are compiled to, for the sources in path."""
+        return join(os.path.abspath(os.path.expanduser(path)), self._build_directory_for_platform(platform))
+
+    def _build_directory_for_platform(self, platform: Platform) -> str:
+        # every profile keeps its own objects, as they are compiled with different flags
+        return f"{self._BUILD_DIRECTORY}/{platform.name.lower()}/{self._profile.name}"
+
+    def _cflags(self) -> str:
+        # flags given in the environment are added to the ones of the profile
+        return f"{self._profile.cflags} {os.environ.get('CFLAGS', '')}".strip()
+
+    def _exported_symbols(self) -> list[str]:
+        with open(self._exports) as file:
+            return [line.strip() for line in file if line.strip() != ""]
+
+    def _write_export_file(self, platform: Platform, path: str) -> str:
+        """Writes the exported symbols in the format of the linker of the platform and returns its relative path."""
+        symbols = self._exported_symbols()
+        if platform == Platform.LINUX:
+            file_name = "exports.map"
+            content = "{\n  global:\n" + "".join(f"    {symbol};\n" for symbol in symbols) + "  local: *;\n};\n"
+        elif platform == Platform.MAC:
+            file_name = "exports.list"
+            content = "".join(f"_{symbol}\n" for symbol in symbols)
+        elif platform == Platform.WINDOWS:
+            file_name = "exports.def"
+            content = "EXPORTS\n" + "".join(f"    {symbol}\n" for symbol in symbols)
+        else:
+            raise Exception("Unknown platform")
+        build_directory = self._build_directory_for_platform(platform)
+        os.makedirs(join(path, build_directory), exist_ok=True)
+        with open(join(path, build_directory, file_name), "w") as file:
+            file.write(content)
+        return f"{build_directory}/{file_name}"
+
+    def _timing_log_for_platform(self, platform: Platform) -> str:
+        return f"{self._build_directory_for_platform(platform)}/{self._TIMING_LOG}"
+
+    def _timing_variables(self, platform: Platform, path: str) -> str:
+        if self.native_compiler_for_platform(platform) is not None:
+            timing_command = f"{sys.executable} {self._TIMED_COMMAND}"
+        else:
+            # the docker image only sees the sources, so the script is placed next to the objects
+            timed_command = f"{self._build_directory_for_platform(platform)}/timedcommand.sh"
+            os.makedirs(join(path, self._build_directory_for_platform(platform)), exist_ok=True)
+            copyfile(self._TIMED_COMMAND_SHELL, join(path, timed_command))
+            timing_command = f"sh {timed_command}"
+        return f" timing_command=\"{timing_command}\" timing_log=\"{self._timing_log_for_platform(platform)}\""
+
+    def _make_variables(self, platform: Platform, path: str) -> str:
+        variables = ""
+        if self._record_telemetry:
+            variables += self._timing_variables(platform, path)
+        if self._exports is not None:
+            variables += f" exports=\"{self._write_export_file(platform, path)}\""
+        if self._gc_sections:
+            variables += " gc_sections=1"
+        if self._strip:
+            variables += " strip=1"
+        return variables
+
+    def _makefile_name_for_platform(self, platform: Platform) -> str:
+        return f"{self._MAKEFILE_NAME}.{platform.name.lower()}"
+
+    def _setup(self, path: str, platform: Platform):
+        self.place_makefile(path, self._makefile_name_for_platform(platform))
 
-    def _cleanup(self, path: str):
-        os.remove(join(path, self._MAKEFILE_NAME))
+    def _cleanup(self, path: str, platform: Platform):
+        makefile = join(path, self._makefile_name_for_platform(platform))
+        if os.path.exists(makefile):
+            os.remove(makefile)
 
-    def compile(self, path: str, output_path: str, name: str, do_not_create_makefile: bool = False):
+    def compile(
+            self,
+            path: str,
+            output_path: str,
+            name: str,
+            do_not_create_makefile: bool = False,
+            platforms: Optional[list[Platform]] = None
+    ):
         path = os.path.abspath(os.path.expanduser(path))
         output_path = os.path.abspath(os.path.expanduser(output_path))
+        if platforms is None:
+            platforms = self._PLATFORMS
+        makefile_names = {platform: self._MAKEFILE_NAME for platform in platforms}
         if not do_not_create_makefile:
-            self._setup(path)
-        self._compile(Platform.LINUX, path, output_path, name)
-        self._compile(Platform.MAC, path, output_path, name)
-        self._compile(Platform.WINDOWS, path, output_path, name)
-        if not do_not_create_makefile:
-            self._cleanup(path)
+            # every platform gets its own Makefile, so parallel builds do not share any file they create
+            makefile_names = {platform: self._makefile_name_for_platform(platform) for platform in platforms}
+            for platform in platforms:
+                self._setup(path, platform)
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers or len(platforms)) as executor:
+                futures = {platform: executor.submit(self._compile_staged,
+                                                     platform,
+                                                     path,
+                                                     output_path,
+                                                     name,
+                                                     makefile_names[platform])
+                           for platform in platforms}
+            failures = [f"{platform.name.lower()} ({future.exception()})"
+                        for platform, future in futures.items()
+                        if future.exception() is not None]
+        finally:
+            if not do_not_create_makefile:
+                for platform in platforms:
+                    self._cleanup(path, platform)
+        if len(failures) > 0:
+            raise Exception(f"Could not compile for {', '.join(failures)}")
+
+    def _compile_staged(self, platform: Platform, path: str, output_path: str, output_name: str, makefile_name: str):
+        # build into a separate directory and only move finished libraries to the output path
+        staging_path = tempfile.mkdtemp(prefix=f".{platform.name.lower()}_", dir=output_path)
+        timing_log = join(path, self._timing_log_for_platform(platform))
+        if os.path.exists(timing_log):
+            os.remove(timing_log)
+        start = time.perf_counter()
+        cached = False
+        succeeded = False
+        try:
+            if self._cache is None:
+                self._compile(platform, path, staging_path, output_name, makefile_name)
+            else:
+                cached = self._compile_cached(platform, path, staging_path, output_name, makefile_name)
+            for file in os.listdir(staging_path):
+                os.replace(join(staging_path, file), join(output_path, file))
+            succeeded = True
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            if self._record_telemetry:
+                self._add_telemetry(platform, time.perf_counter() - start, cached, succeeded, timing_log)
+
+    def _add_telemetry(self, platform: Platform, total: float, cached: bool, succeeded: bool, timing_log: str):
+        translation_units, link = read_timing_log(timing_log)
+        self.telemetry.append(PlatformTelemetry(
+            platform=platform.name.lower(),
+            profile=self._profile.name,
+            total=total,
+            cached=cached,
+            succeeded=succeeded,
+            translation_units=translation_units,
+            link=link
+        ))
+
+    def _compile_cached(
+            self,
+            platform: Platform,
+            path: str,
+            output_path: str,
+            output_name: str,
+            makefile_name: str
+    ) -> bool:
+        key = self._cache.key(path,
+                              join(path, makefile_name),
+                              self._library_extension_for_platform(platform),
+                              output_name + self._profile.suffix,
+                              f"{self._compiler_identity(platform)}\n{self._cflags()}\n{self._link_identity()}",
+                              self._target_triple_for_platform(platform))
+        if self._cache.restore(key, output_path):
+            print(f"[{platform.name.lower()}] restored from build cache")
+            return True
+        self._compile(platform, path, output_path, output_name, makefile_name)
+        self._cache.store(key, output_path)
+        return False
+
+    def _link_identity(self) -> str:
+        exports = "" if self._exports is None else "\n".join(self._exported_symbols())
+        return f"gc_sections={self._gc_sections} strip={self._strip} exports={exports}"
 
     def place_makefile(self, path: str, makefile_name: str = None):
         if makefile_name is None:
@@ -75,24 +329,43 @@ class SimulinkModelCompiler:
     ):
         if makefile_name is None:
             makefile_name = self._MAKEFILE_NAME
+        output_name += self._profile.suffix
         if platform == Platform.WINDOWS:
             output_name += "_win64"
         file_extension = self._library_extension_for_platform(platform)
         target_triple = self._target_triple_for_platform(platform)
-        command = self._BASE_COMMAND.format(
+        native_compiler = self.native_compiler_for_platform(platform)
+        base_command = self._BASE_COMMAND if native_compiler is None else self._NATIVE_COMMAND
+        command = base_command.format(
             path,
             output_path,
             target_triple,
             file_extension,
             output_name,
-            makefile_name
+            makefile_name,
+            native_compiler,
+            self._build_directory_for_platform(platform),
+            self._make_jobs,
+            self._cflags(),
+            self._make_variables(platform, path)
         )
 
+        prefix = f"[{platform.name.lower()}]"
+        if native_compiler is None:
+            print(f"{prefix} building in docker")
+        else:
+            print(f"{prefix} building natively with {native_compiler}")
+
         process = subprocess.Popen(command,
                                    shell=True,
-                                   stdout=sys.stdout,
-                                   stderr=sys.stderr)
+                                   cwd=path,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.STDOUT,
+                                   text=True)
+
+        for line in process.stdout:
+            print(f"{prefix} {line}", end="")
 
         return_code = process.wait()
         if return_code != 0:
-            raise Exception("Could not compile")
+            raise Exception(f"Could not compile, exit code {return_code}")
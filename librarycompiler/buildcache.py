@@ -0,0 +1,96 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from os.path import join
+from typing import Optional, Union
+
+
+class BuildCache:
+    """
+    Stores compiled libraries by a key of everything that goes into the build. Entries are evicted least recently
+    used first, once the cache grows over its maximum size.
+    """
+    _SOURCE_EXTENSIONS = (".c", ".h")
+    _ENVIRONMENT_FLAGS = ["CC", "CFLAGS", "LIBS", "LDFLAGS"]
+    directory: str
+    max_size: int
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = 1024 ** 3):
+        if directory is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", join(os.path.expanduser("~"), ".cache"))
+            directory = join(cache_home, "slimpyb", "builds")
+        self.directory = directory
+        self.max_size = max_size
+
+    def key(self, path: str, makefile: str, target: str, output_name: str, compiler: str, target_triple: str) -> str:
+        sha = hashlib.sha256()
+
+        def add(value: Union[str, bytes]):
+            if isinstance(value, str):
+                value = value.encode()
+            # the length keeps neighbouring values from running into each other
+            sha.update(len(value).to_bytes(8, "little"))
+            sha.update(value)
+
+        for file in self._source_files(path):
+            add(os.path.relpath(file, path))
+            with open(file, "rb") as source:
+                add(source.read())
+        with open(makefile, "rb") as source:
+            add(source.read())
+        for value in [target, output_name, compiler, target_triple]:
+            add(value)
+        for flag in self._ENVIRONMENT_FLAGS:
+            add(f"{flag}={os.environ.get(flag, '')}")
+        return sha.hexdigest()
+
+    def _source_files(self, path: str) -> list[str]:
+        files = []
+        for directory, directories, names in os.walk(path):
+            directories.sort()
+            files += [join(directory, name) for name in sorted(names) if name.endswith(self._SOURCE_EXTENSIONS)]
+        return files
+
+    def restore(self, key: str, output_path: str) -> bool:
+        entry = join(self.directory, key)
+        if not os.path.isdir(entry):
+            return False
+        # copied instead of linked, so stripping or patching a restored binary does not change the entry. An existing
+        # output is removed first, it may still be a link to an entry restored by an earlier version.
+        for file in os.listdir(entry):
+            if os.path.lexists(join(output_path, file)):
+                os.remove(join(output_path, file))
+            shutil.copy2(join(entry, file), join(output_path, file))
+        # the modification time of an entry is its last use
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, path: str):
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".", dir=self.directory)
+        try:
+            for file in os.listdir(path):
+                shutil.copy2(join(path, file), join(staging, file))
+            os.rename(staging, join(self.directory, key))
+        except OSError:
+            # the same build was stored by someone else in the meantime
+            pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = join(self.directory, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = sum(os.path.getsize(join(entry, file)) for file in os.listdir(entry))
+            entries.append((os.path.getmtime(entry), size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
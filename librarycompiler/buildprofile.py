@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class BuildProfile:
+    name: str
+    cflags: str
+    # appended to the binary name, the generated bindings load it with build_profile=name
+    suffix: str
+    # the binaries are not stripped, as the debug information is what they are built for
+    debug_info: bool = False
+
+
+DEBUG = BuildProfile(name="debug", cflags="-O0 -g", suffix="_debug", debug_info=True)
+# the portable build, which is loaded by default
+RELEASE = BuildProfile(name="release", cflags="-O2", suffix="")
+# only runs on CPUs supporting the instructions of the CPU it was built on
+NATIVE = BuildProfile(name="native", cflags="-O3 -march=native -flto", suffix="_native")
+FAST_MATH = BuildProfile(name="fast-math", cflags="-O3 -ffast-math", suffix="_fast-math")
+
+BUILD_PROFILES = {profile.name: profile for profile in [DEBUG, RELEASE, NATIVE, FAST_MATH]}
@@ -0,0 +1,32 @@
+import ctypes
+import functools
+import os
+import shutil
+import tempfile
+
+from librarycompiler.SimulinkModelCompiler import SimulinkModelCompiler
+from librarycompiler.buildcache import BuildCache
+
+
+@functools.cache
+def load_native_library(source_directory: str, name: str) -> ctypes.CDLL:
+    """
+    Compiles the C sources of the directory for the host, like a model, and loads the library. The library is cached
+    with the models in the build cache and loaded only once per process.
+    """
+    compiler = SimulinkModelCompiler(cache=BuildCache())
+    platform = compiler.native_platform()
+    if platform is None:
+        raise Exception(f"{name} needs a native build for the platform of the host")
+    # the loaded library cannot be removed on every platform, so errors of the cleanup are ignored
+    directory = tempfile.mkdtemp()
+    try:
+        # the build directory is created next to the sources, which may not be writable
+        sources = os.path.join(directory, "source")
+        shutil.copytree(source_directory, sources)
+        output_directory = os.path.join(directory, "output")
+        os.makedirs(output_directory)
+        compiler.compile(sources, output_directory, name, platforms=[platform])
+        return ctypes.CDLL(os.path.join(output_directory, os.listdir(output_directory)[0]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
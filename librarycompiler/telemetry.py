@@ -0,0 +1,78 @@
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class StepTiming:
+    name: str
+    duration: float
+    succeeded: bool
+
+
+@dataclass(frozen=True)
+class PlatformTelemetry:
+    platform: str
+    profile: str
+    total: float
+    cached: bool
+    succeeded: bool
+    translation_units: list[StepTiming]
+    link: Optional[StepTiming]
+
+
+def read_timing_log(log: str) -> tuple[list[StepTiming], Optional[StepTiming]]:
+    """Returns the compile times of the translation units and the link time logged by the timed commands."""
+    translation_units: list[StepTiming] = []
+    link = None
+    if not os.path.exists(log):
+        return translation_units, link
+    with open(log) as file:
+        for line in file:
+            label, start, end, return_code = line.rstrip("\n").split("\t")
+            # the objects are named after their source files, everything else is the link of the library target
+            name = os.path.basename(label)
+            timing = StepTiming(name=name, duration=float(end) - float(start), succeeded=return_code == "0")
+            if name.endswith(".o"):
+                translation_units.append(StepTiming(name=name.removesuffix(".o") + ".c",
+                                                    duration=timing.duration,
+                                                    succeeded=timing.succeeded))
+            else:
+                link = timing
+    return translation_units, link
+
+
+def _slowest_translation_units(
+        telemetry: list[PlatformTelemetry],
+        count: int
+) -> list[tuple[PlatformTelemetry, StepTiming]]:
+    timings = [(entry, timing) for entry in telemetry for timing in entry.translation_units]
+    return sorted(timings, key=lambda it: it[1].duration, reverse=True)[:count]
+
+
+def write_report(telemetry: list[PlatformTelemetry], file: str, slowest: int = 10):
+    report = {
+        "platforms": [asdict(entry) for entry in telemetry],
+        "slowest_translation_units": [{"platform": entry.platform, "profile": entry.profile, **asdict(timing)}
+                                      for entry, timing in _slowest_translation_units(telemetry, slowest)]
+    }
+    with open(file, "w") as output:
+        json.dump(report, output, indent=2)
+
+
+def format_summary(telemetry: list[PlatformTelemetry], slowest: int = 10) -> str:
+    lines = [f"{'Platform':<10} {'Profile':<12} {'Total':>9} {'Compile':>9} {'Link':>9}  Files"]
+    for entry in telemetry:
+        compile_time = sum(timing.duration for timing in entry.translation_units)
+        link_time = "-" if entry.link is None else f"{entry.link.duration:.2f}s"
+        files = "cached" if entry.cached else str(len(entry.translation_units))
+        lines.append(f"{entry.platform:<10} {entry.profile:<12} {entry.total:>8.2f}s {compile_time:>8.2f}s "
+                     f"{link_time:>9}  {files}")
+    slowest_translation_units = _slowest_translation_units(telemetry, slowest)
+    if len(slowest_translation_units) > 0:
+        lines.append("")
+        lines.append("Slowest translation units:")
+        for entry, timing in slowest_translation_units:
+            lines.append(f"{timing.duration:>8.2f}s  {entry.platform:<10} {entry.profile:<12} {timing.name}")
+    return "\n".join(lines)
@@ -0,0 +1,13 @@
+import subprocess
+import sys
+import time
+
+# Runs a command and appends "<label>\t<start>\t<end>\t<exit code>" to a log file, usage: log label command...
+if __name__ == '__main__':
+    log, label, command = sys.argv[1], sys.argv[2], sys.argv[3:]
+    start = time.time()
+    return_code = subprocess.call(command)
+    end = time.time()
+    with open(log, "a") as file:
+        file.write(f"{label}\t{start:.6f}\t{end:.6f}\t{return_code}\n")
+    sys.exit(return_code)
@@ -0,0 +1,12 @@
+#!/bin/sh
+# Runs a command and appends "<label>\t<start>\t<end>\t<exit code>" to a log file, usage: log label command...
+# Used inside the docker image, where GNU date is available and python might not be.
+log=$1
+label=$2
+shift 2
+start=$(date +%s.%N)
+"$@"
+return_code=$?
+end=$(date +%s.%N)
+printf '%s\t%s\t%s\t%s\n' "$label" "$start" "$end" "$return_code" >> "$log"
+exit $return_code
@@ -0,0 +1,224 @@
+import ctypes
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from cosimulation import is_pointer_type, is_value_type
+
+_FLOATING_TYPES = (ctypes.c_float, ctypes.c_double, ctypes.c_longdouble)
+_CONTAINER_TYPES = (ctypes.Structure, ctypes.Union, ctypes.Array)
+# the continuous states keep the name of their global, <model>_X
+_CONTINUOUS_STATES_PATTERN = re.compile(r".+_X")
+
+
+@dataclass(frozen=True)
+class OperatingPoint:
+    """The values of the states and inputs, in the order of the rows and columns of the linearization."""
+    states: np.ndarray
+    inputs: np.ndarray
+
+
+@dataclass(frozen=True)
+class Linearization:
+    """
+    The linearization of one step around an operating point, x[k + 1] = A x[k] + B u[k] and y[k] = C x[k] + D u[k].
+    The names of the states, inputs and outputs are the paths of the values in their structs.
+    """
+    A: np.ndarray
+    B: np.ndarray
+    C: np.ndarray
+    D: np.ndarray
+    states: list[str]
+    inputs: list[str]
+    outputs: list[str]
+
+
+@dataclass(frozen=True)
+class _Leaf:
+    path: str
+    field: str
+    offset: int
+    type: type
+
+
+def _leaves(typ: type, field: str, offset: int = 0, path: str = "") -> list[_Leaf]:
+    if issubclass(typ, (ctypes.Structure, ctypes.Union)):
+        leaves = []
+        for name, field_type, *_ in typ._fields_:
+            member_path = f"{path}.{name}" if path else name
+            leaves += _leaves(field_type, field, offset + getattr(typ, name).offset, member_path)
+        return leaves
+    elif issubclass(typ, ctypes.Array):
+        element_size = ctypes.sizeof(typ._type_)
+        return [leaf for index in range(typ._length_)
+                for leaf in _leaves(typ._type_, field, offset + index * element_size, f"{path}[{index}]")]
+    return [_Leaf(path=path, field=field, offset=offset, type=typ)]
+
+
+def _globals(system) -> dict[str, object]:
+    # the structs and values the generated system accesses in the library, like inputs, outputs and states
+    return {name: value for name, value in vars(system).items()
+            if isinstance(value, _CONTAINER_TYPES) or is_value_type(type(value))}
+
+
+def _pointer_targets(system, fields: dict[str, object]) -> dict[str, object]:
+    # the structs behind pointer globals, like the real time model with the clock and solver state, keyed *<name>
+    ranges = [(ctypes.addressof(value), ctypes.addressof(value) + ctypes.sizeof(value)) for value in fields.values()]
+    targets = {}
+    for name, value in vars(system).items():
+        if not hasattr(type(value), "contents") or not value:
+            continue
+        target = value.contents
+        address = ctypes.addressof(target)
+        # a target inside a global is already part of the snapshot and keeps the values of the operating point
+        if (isinstance(target, _CONTAINER_TYPES) or is_value_type(type(target))) and \
+                not any(start <= address < end for start, end in ranges):
+            targets[f"*{name}"] = target
+    return targets
+
+
+def _state(system) -> dict[str, object]:
+    fields = _globals(system)
+    return {**fields, **_pointer_targets(system, fields)}
+
+
+def _continuous_states_field(system) -> Optional[str]:
+    fields = [name for name, value in _globals(system).items()
+              if _CONTINUOUS_STATES_PATTERN.fullmatch(name) and isinstance(value, (ctypes.Structure, ctypes.Union))]
+    if len(fields) > 1:
+        raise Exception(f"Several globals of the system look like continuous states: {', '.join(fields)}")
+    return fields[0] if len(fields) > 0 else None
+
+
+def _floating_leaves(system, field: Optional[str]) -> list[_Leaf]:
+    value = _globals(system).get(field)
+    if value is None:
+        return []
+    return [leaf for leaf in _leaves(type(value), field) if issubclass(leaf.type, _FLOATING_TYPES)]
+
+
+def _read(fields: dict[str, object], leaves: list[_Leaf]) -> np.ndarray:
+    return np.array([leaf.type.from_address(ctypes.addressof(fields[leaf.field]) + leaf.offset).value
+                     for leaf in leaves], dtype=float)
+
+
+class _Instance:
+    """A system loaded from its own copy of the binary, so it does not share the globals of the original system."""
+    system: object
+    _fields: dict[str, object]
+    _pointers: list[tuple[int, bytes]]
+
+    def __init__(self, system, directory: str, index: int):
+        base = os.path.join(os.path.dirname(system.dll_path), system.model)
+        model = os.path.join(directory, f"instance{index}")
+        shutil.copyfile(system.dll_path, model + system.dll_path[len(base):])
+        # the binary name is an absolute path, the profile suffix is already part of the copied file
+        self.system = type(system)(model=model, build_profile="release")
+        self.system.initialize()
+        self._fields = _state(self.system)
+        # pointers, like the ones in the real time model, have to keep pointing into this instance
+        self._pointers = []
+        for name, value in self._fields.items():
+            for leaf in _leaves(type(value), name):
+                if is_pointer_type(leaf.type):
+                    address = ctypes.addressof(value) + leaf.offset
+                    self._pointers.append((address, ctypes.string_at(address, ctypes.sizeof(leaf.type))))
+
+    def restore(self, snapshot: dict[str, bytes]):
+        if snapshot.keys() != self._fields.keys():
+            raise Exception(f"The instance of {self.system.model} does not have the globals and pointer targets of "
+                            f"the system: {', '.join(sorted(snapshot.keys() ^ self._fields.keys()))}")
+        for name, data in snapshot.items():
+            ctypes.memmove(ctypes.addressof(self._fields[name]), data, len(data))
+        for address, data in self._pointers:
+            ctypes.memmove(address, data, len(data))
+
+    def write(self, leaf: _Leaf, value: float):
+        leaf.type.from_address(ctypes.addressof(self._fields[leaf.field]) + leaf.offset).value = value
+
+    def read(self, leaves: list[_Leaf]) -> np.ndarray:
+        return _read(self._fields, leaves)
+
+
+def _snapshot(system, states: list[_Leaf], inputs: list[_Leaf], operating_point: Optional[OperatingPoint]):
+    snapshot = {name: bytearray(ctypes.string_at(ctypes.addressof(value), ctypes.sizeof(value)))
+                for name, value in _state(system).items()}
+    if operating_point is not None:
+        for leaves, values in [(states, operating_point.states), (inputs, operating_point.inputs)]:
+            if len(values) != len(leaves):
+                raise Exception(f"The operating point has {len(values)} values instead of {len(leaves)}")
+            for leaf, value in zip(leaves, values):
+                leaf.type.from_buffer(snapshot[leaf.field], leaf.offset).value = value
+    return {name: bytes(data) for name, data in snapshot.items()}
+
+
+def current_operating_point(system) -> OperatingPoint:
+    """Returns the current states and inputs of the system."""
+    fields = _globals(system)
+    return OperatingPoint(states=_read(fields, _floating_leaves(system, _continuous_states_field(system))),
+                          inputs=_read(fields, _floating_leaves(system, "inputs")))
+
+
+def linearize(
+        system,
+        operating_point: Optional[OperatingPoint] = None,
+        eps: float = 1e-6,
+        workers: Optional[int] = None
+) -> Linearization:
+    """
+    Linearizes one step of the system (ctypes backend) with forward differences. Every floating point value of the
+    continuous states (<model>_X) and inputs is perturbed by eps on its own and the system is stepped once, starting
+    from a snapshot of all its globals and of the structs behind its pointer globals, like the real time model with
+    the model time. The operating point replaces the states and inputs of the snapshot. The
+    perturbations are spread over workers instances of the system, each loaded from its own copy of the binary and
+    stepped in its own thread. The system itself is not changed.
+    """
+    if not isinstance(getattr(system, "inputs", None), (ctypes.Structure, ctypes.Union)):
+        raise Exception("The linearization needs a system generated with the ctypes backend")
+    states = _floating_leaves(system, _continuous_states_field(system))
+    inputs = _floating_leaves(system, "inputs")
+    outputs = _floating_leaves(system, "outputs")
+    snapshot = _snapshot(system, states, inputs, operating_point)
+    perturbations: list[Optional[_Leaf]] = [None] + states + inputs
+    workers = min(workers or os.cpu_count() or 1, len(perturbations))
+
+    def run(instance: _Instance, leaves: list[Optional[_Leaf]]) -> list[tuple[np.ndarray, np.ndarray]]:
+        results = []
+        for leaf in leaves:
+            instance.restore(snapshot)
+            if leaf is not None:
+                instance.write(leaf, leaf.type.from_buffer_copy(snapshot[leaf.field], leaf.offset).value + eps)
+            instance.system.step()
+            results.append((instance.read(states), instance.read(outputs)))
+        return results
+
+    # the copies of the binary stay loaded, they cannot be removed on every platform
+    directory = tempfile.mkdtemp()
+    try:
+        instances = [_Instance(system, directory, index) for index in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(run, instances, [perturbations[index::workers] for index in range(workers)]))
+        for instance in instances:
+            instance.system.terminate()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    results = [chunks[index % workers][index // workers] for index in range(len(perturbations))]
+
+    nominal_states, nominal_outputs = results[0]
+    state_columns = [(next_states - nominal_states) / eps for next_states, _ in results[1:]]
+    output_columns = [(next_outputs - nominal_outputs) / eps for _, next_outputs in results[1:]]
+    state_matrix = np.array(state_columns).reshape(len(perturbations) - 1, len(states)).T
+    output_matrix = np.array(output_columns).reshape(len(perturbations) - 1, len(outputs)).T
+    return Linearization(A=state_matrix[:, :len(states)],
+                         B=state_matrix[:, len(states):],
+                         C=output_matrix[:, :len(states)],
+                         D=output_matrix[:, len(states):],
+                         states=[leaf.path for leaf in states],
+                         inputs=[leaf.path for leaf in inputs],
+                         outputs=[leaf.path for leaf in outputs])
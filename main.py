@@ -1,16 +1,26 @@
 import argparse
 import os.path
+import subprocess
 import sys
 from pathlib import Path
+from typing import Optional
 
-from pycparser import parse_file
+from pycparser import preprocess_file, CParser
 
+from astparser.model import Module
 from astparser.moduelcleaner import ModuleCleaner
 from astparser.parser import AstParser
 from bindinggenerator import primitive_names
+from bindinggenerator.cffiwriter import CffiSystemWriter
+from bindinggenerator.generator import ElementArranger
+from bindinggenerator.multirate import read_sample_time_ratios
 from bindinggenerator.systemgenerator import SystemGenerator
 from bindinggenerator.writer import PythonBindingWriter, CtypesMapper, SystemWriter
-from librarycompiler.SimulinkModelCompiler import SimulinkModelCompiler
+from librarycompiler.SimulinkModelCompiler import SimulinkModelCompiler, Platform
+from librarycompiler.buildcache import BuildCache
+from librarycompiler.buildprofile import BUILD_PROFILES
+from librarycompiler.telemetry import write_report, format_summary
+from profiler import Profiler, StageProfiler
 
 
 class PathAction(argparse.Action):
@@ -32,31 +42,89 @@ def header_file(file: str):
         raise argparse.ArgumentTypeError(f"{file} is not a valid header (.h) file")
 
 
-def generate_bindings(main_file: str, output_path: str, bindgins_name: str, binary_name: str):
+def parse_header(main_file: str, profiler: Profiler = Profiler()) -> Module:
     fake_libc_location = str(Path(__file__).parent.absolute().joinpath("fake_libc_include"))
 
-    ast = parse_file(main_file,
-                     use_cpp=True,
-                     cpp_path="clang",
-                     cpp_args=['-E', "-I" + fake_libc_location, '-D_Atomic(x)=x', '-D_Bool=int', '-D__extension__=',
-                               '-U__STDC__'])
+    with profiler.stage("preprocessing"):
+        text = preprocess_file(main_file,
+                               cpp_path="clang",
+                               cpp_args=['-E', "-I" + fake_libc_location, '-D_Atomic(x)=x', '-D_Bool=int',
+                                         '-D__extension__=', '-U__STDC__'])
+
+    with profiler.stage("c parsing"):
+        ast = CParser().parse(text, main_file)
+        profiler.count("declarations", len(ast.ext))
+
     ast_parser = AstParser()
     module_cleaner = ModuleCleaner()
     module_cleaner.externally_known_type_name = primitive_names
     ast_parser.origin_file_filter = lambda it: "fake_libc_include" not in it
-    module = ast_parser.parse(ast)
-    module = module_cleaner.remove_not_used_elements(module)
+    with profiler.stage("ast parsing"):
+        module = ast_parser.parse(ast)
+        profiler.count("type definitions", len(module.type_definitions))
+        profiler.count("containers", len(module.container))
+        profiler.count("enums", len(module.enums))
+        profiler.count("fields", len(module.fields))
+        profiler.count("methods", len(module.methods))
+
+    with profiler.stage("module cleaning"):
+        cleaned_module = module_cleaner.remove_not_used_elements(module)
+        profiler.count("type definitions kept", len(cleaned_module.type_definitions))
+        profiler.count("type definitions dropped", len(module.type_definitions) - len(cleaned_module.type_definitions))
+        profiler.count("containers kept", len(cleaned_module.container))
+        profiler.count("containers dropped", len(module.container) - len(cleaned_module.container))
+        profiler.count("enums kept", len(cleaned_module.enums))
+        profiler.count("enums dropped", len(module.enums) - len(cleaned_module.enums))
+    return cleaned_module
+
+
+def generate_bindings(
+        main_file: str,
+        output_path: str,
+        bindgins_name: str,
+        binary_name: str,
+        profiler: Profiler = Profiler(),
+        backend: str = "ctypes",
+        sample_time_ratios: Optional[dict[int, int]] = None
+):
+    """
+    With the cffi backend, the system accesses the library through a compiled cffi module instead of ctypes. The
+    sample time ratios of multi-rate models are read from the model source, unless they are given.
+    """
+    module = parse_header(main_file, profiler)
+    if sample_time_ratios is None:
+        sample_time_ratios = read_sample_time_ratios(main_file)
 
     system_generator = SystemGenerator()
-    system = system_generator.generate(
-        module,
-        name=bindgins_name,
-        binary_basename=binary_name
-    )
+    element_arranger = ElementArranger()
+    with profiler.stage("system generation"):
+        system = system_generator.generate(
+            module,
+            name=bindgins_name,
+            binary_basename=binary_name,
+            element_arranger=element_arranger,
+            sample_time_ratios=sample_time_ratios
+        )
+        profiler.count("binding elements", sum(len(binding.elements) for binding in system.bindingFiles))
+        profiler.count("sort rounds", element_arranger.statistics.sort_rounds)
+        profiler.count("splits", element_arranger.statistics.splits)
+        profiler.count("additional elements", element_arranger.statistics.additional_elements)
 
     ctypes_mapper = CtypesMapper()
     system_writer = SystemWriter(ctypes_mapper)
-    system_writer.write(system, output_path, PythonBindingWriter(ctypes_mapper))
+    if backend == "cffi":
+        system_writer = CffiSystemWriter(ctypes_mapper)
+    elif backend != "ctypes":
+        raise Exception(f"Unknown backend {backend}")
+    with profiler.stage("writing"):
+        system_writer.write(system, output_path, PythonBindingWriter(ctypes_mapper))
+
+    if backend == "cffi":
+        with profiler.stage("cffi module building"):
+            subprocess.run([sys.executable, CffiSystemWriter.build_script_name(system)],
+                           cwd=output_path,
+                           stdout=subprocess.DEVNULL,
+                           check=True)
 
 
 if __name__ == '__main__':
@@ -67,7 +135,42 @@ if __name__ == '__main__':
     parser.add_argument(dest='output_path', action='store', type=dir_path)
     parser.add_argument('-b', '--binary-name', dest='binary_name', action='store', default=None)
     parser.add_argument('-c', '--compile', dest="compile", action='store_true', default=False)
+    parser.add_argument('--compile-jobs', dest='compile_jobs', action='store', type=int, default=None,
+                        help='number of platforms compiled at the same time (default: all)')
+    parser.add_argument('--make-jobs', dest='make_jobs', action='store', type=int, default=None,
+                        help='number of source files make compiles at the same time per platform (default: CPU count)')
+    parser.add_argument('--build-profile', dest='build_profiles', action='append', default=None,
+                        choices=list(BUILD_PROFILES.keys()),
+                        help='profile to compile the binaries with, can be given multiple times (default: release)')
+    parser.add_argument('--platform', dest='platforms', action='append', default=None,
+                        choices=[platform.name.lower() for platform in Platform],
+                        help='platform to compile for, can be given multiple times (default: all)')
+    parser.add_argument('--docker', dest='force_docker', action='store_true', default=False,
+                        help='compile every platform in docker, even the ones the host can build natively')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true', default=False,
+                        help='always compile, instead of reusing unchanged binaries from the build cache')
+    parser.add_argument('--export-all', dest='export_all', action='store_true', default=False,
+                        help='export all symbols, instead of only the ones in the export list of the bindings')
+    parser.add_argument('--gc-sections', dest='gc_sections', action='store_true', default=False,
+                        help='remove functions and data the exported symbols do not use')
+    parser.add_argument('--strip', dest='strip', action='store_true', default=False,
+                        help='strip the symbol tables and debug information from the binaries, except the debug ones')
+    parser.add_argument('--compile-report', dest='compile_report', action=PathAction, default=None,
+                        help='write the compile time of every source file, link and platform to the given JSON file')
     parser.add_argument('-g', '--generate-bindings', dest='bindings_name', action='store', default=None)
+    parser.add_argument('--backend', dest='backend', action='store', default='ctypes', choices=['ctypes', 'cffi'],
+                        help='access the library with ctypes or a compiled cffi module (needs cffi and a C compiler)')
+    parser.add_argument('--sample-time-ratios', dest='sample_time_ratios', type=int, nargs='+', default=None,
+                        help='base ticks of every rate of a multi-rate model, starting with 1 for the base rate '
+                             '(default: read from the model source)')
+    parser.add_argument('--profile', dest='profile', action='store_true', default=False,
+                        help='print time, memory and counters of every bindings generation stage')
+    parser.add_argument('--profile-memory', dest='profile_memory', action='store_true', default=False,
+                        help='generate the bindings a second time to measure the peak memory of every profiled stage')
+    parser.add_argument('--profile-json', dest='profile_json', action=PathAction, default=None,
+                        help='write the bindings generation profile to the given JSON file')
+    parser.add_argument('--profile-cprofile', dest='profile_cprofile', type=dir_path, action=PathAction,
+                        default=None, help='write a cProfile dump of every bindings generation stage to the directory')
 
     arguments = parser.parse_args(sys.argv[1:])
 
@@ -75,12 +178,60 @@ if __name__ == '__main__':
     if binary_name is None:
         binary_name = Path(arguments.header).stem
 
-    if arguments.compile:
-        print(f"Compiling binaries with basename {binary_name}")
-        SimulinkModelCompiler().compile(str(Path(arguments.header).parent), arguments.output_path, binary_name)
-        print("Done compiling")
-
+    # the bindings are generated first, as the compiler uses the export list written with them
     if arguments.bindings_name is not None:
+        profiler = Profiler()
+        if arguments.profile or arguments.profile_json is not None or arguments.profile_cprofile is not None:
+            profiler = StageProfiler()
+            profiler.cprofile_directory = arguments.profile_cprofile
         print(f"Generating bindings for {arguments.bindings_name}")
-        generate_bindings(arguments.header, arguments.output_path, arguments.bindings_name, binary_name)
+        sample_time_ratios = None
+        if arguments.sample_time_ratios is not None:
+            sample_time_ratios = dict(enumerate(arguments.sample_time_ratios))
+        generate_bindings(arguments.header, arguments.output_path, arguments.bindings_name, binary_name, profiler,
+                          arguments.backend, sample_time_ratios)
+        if isinstance(profiler, StageProfiler) and arguments.profile_memory:
+            # tracing the memory distorts the timings, so it is done in a run of its own
+            memory_profiler = StageProfiler()
+            memory_profiler.trace_memory = True
+            generate_bindings(arguments.header, arguments.output_path, arguments.bindings_name, binary_name,
+                              memory_profiler, arguments.backend, sample_time_ratios)
+            profiler.add_peak_memory(memory_profiler)
         print("Done generating bindings")
+        if arguments.profile:
+            print(profiler.format())
+        if arguments.profile_json is not None:
+            with open(arguments.profile_json, "w") as file:
+                file.write(profiler.to_json())
+
+    if arguments.compile:
+        print(f"Compiling binaries with basename {binary_name}")
+        platforms = None
+        if arguments.platforms is not None:
+            platforms = [Platform[platform.upper()] for platform in dict.fromkeys(arguments.platforms)]
+        # the export list is written by the bindings generation, of this or a previous run
+        exports = os.path.join(arguments.output_path, f"{binary_name}.exports")
+        if arguments.export_all or not os.path.exists(exports):
+            exports = None
+        build_profiles = dict.fromkeys(arguments.build_profiles or ["release"])
+        telemetry = []
+        for build_profile in build_profiles:
+            compiler = SimulinkModelCompiler(max_workers=arguments.compile_jobs,
+                                             force_docker=arguments.force_docker,
+                                             make_jobs=arguments.make_jobs,
+                                             cache=None if arguments.no_cache else BuildCache(),
+                                             profile=BUILD_PROFILES[build_profile],
+                                             exports=exports,
+                                             gc_sections=arguments.gc_sections,
+                                             strip=arguments.strip,
+                                             record_telemetry=arguments.compile_report is not None)
+            try:
+                compiler.compile(str(Path(arguments.header).parent), arguments.output_path, binary_name,
+                                 platforms=platforms)
+            finally:
+                telemetry += compiler.telemetry
+                if arguments.compile_report is not None:
+                    write_report(telemetry, arguments.compile_report)
+        print("Done compiling")
+        if arguments.compile_report is not None:
+            print(format_summary(telemetry))
@@ -0,0 +1,206 @@
+import ctypes
+import json
+import math
+import os
+import struct
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Any
+
+from cosimulation import locate, is_pointer_type
+from librarycompiler.nativelibrary import load_native_library
+
+_NATIVE_DIRECTORY = os.path.join(os.path.dirname(__file__), "native")
+_LIBRARY_NAME = "seqlock"
+
+# magic, version, descriptor size, data offset and data size, followed by the sequence and step of the seqlock
+_HEADER_FORMAT = "=4sIQQQ"
+_MAGIC = b"SLPB"
+_VERSION = 1
+_SEQLOCK_OFFSET = 32
+_HEADER_SIZE = 64
+_ALIGNMENT = 8
+
+# the segments of the publishers of this process, the resource tracker has to remove them
+_published: set[str] = set()
+
+
+@dataclass(frozen=True)
+class Frame:
+    """The values of a published step, by their path. Arrays are nested lists."""
+    sequence: int
+    step: int
+    values: dict[str, Any]
+
+
+class _Copy(ctypes.Structure):
+    _fields_ = [("source", ctypes.c_void_p), ("destination", ctypes.c_size_t), ("size", ctypes.c_size_t)]
+
+
+def _load_library() -> ctypes.CDLL:
+    library = load_native_library(_NATIVE_DIRECTORY, _LIBRARY_NAME)
+    # seqlock_write has no argtypes, converting them takes as long as the call, its arguments are passed as ctypes
+    library.seqlock_write.restype = None
+    library.seqlock_read.restype = ctypes.c_uint64
+    library.seqlock_read.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+                                     ctypes.POINTER(ctypes.c_uint64), ctypes.c_uint64]
+    return library
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _format(typ: type, path: str) -> str:
+    if is_pointer_type(typ):
+        return "P"
+    code = getattr(typ, "_type_", None)
+    if not isinstance(code, str) or code not in "cbB?hHiIlLqQnNefdP":
+        raise Exception(f"{path} of type {typ.__name__} cannot be published")
+    return code
+
+
+def _fields(typ: type, path: str, offset: int) -> list[dict[str, Any]]:
+    """Lists the values of the type, arrays of values are a single field with their shape."""
+    if issubclass(typ, (ctypes.Structure, ctypes.Union)):
+        return [field for name, field_type, *_ in typ._fields_
+                for field in _fields(field_type, f"{path}.{name}", offset + getattr(typ, name).offset)]
+    shape = []
+    element = typ
+    while issubclass(element, ctypes.Array):
+        shape.append(element._length_)
+        element = element._type_
+    if len(shape) > 0 and issubclass(element, (ctypes.Structure, ctypes.Union)):
+        return [field for index in range(typ._length_)
+                for field in _fields(typ._type_, f"{path}[{index}]", offset + index * ctypes.sizeof(typ._type_))]
+    return [{"path": path, "offset": offset, "format": _format(element, path), "shape": shape}]
+
+
+def _shaped(values: tuple, shape: list[int]):
+    if len(shape) == 0:
+        return values[0]
+    if len(shape) == 1:
+        return list(values)
+    size = len(values) // shape[0]
+    return [_shaped(values[index * size:(index + 1) * size], shape[1:]) for index in range(shape[0])]
+
+
+class Publisher:
+    """
+    Mirrors values of a generated system (ctypes backend) into a shared memory segment after every few steps. The
+    frames are written with a seqlock, readers never block the publisher and retry when they read a frame while it
+    was written. Paths are like "outputs" or "signals.b.v".
+    """
+    system: object
+    every: int
+    steps: int
+
+    def __init__(self, system, name: str, paths: Optional[list[str]] = None, every: int = 1):
+        if every < 1:
+            raise Exception("Frames have to be published at least every step")
+        self._library = _load_library()
+        self.system = system
+        self.every = every
+        self.steps = 0
+        copies = []
+        fields = []
+        data_size = 0
+        for path in paths or ["outputs"]:
+            address, typ = locate(system, path)
+            copies.append((address, data_size, ctypes.sizeof(typ)))
+            fields += _fields(typ, path, data_size)
+            data_size = _align(data_size + ctypes.sizeof(typ))
+        descriptor = json.dumps({"every": every, "fields": fields}).encode()
+        data_offset = _align(_HEADER_SIZE + len(descriptor))
+
+        self._memory = SharedMemory(name=name, create=True, size=data_offset + data_size)
+        _published.add(self._memory.name)
+        self._buffer = (ctypes.c_char * (data_offset + data_size)).from_buffer(self._memory.buf)
+        struct.pack_into(_HEADER_FORMAT, self._memory.buf, 0, _MAGIC, _VERSION, len(descriptor), data_offset,
+                         data_size)
+        self._memory.buf[_HEADER_SIZE:_HEADER_SIZE + len(descriptor)] = descriptor
+        # converted once, as publishing is on the hot path of the simulation
+        self._write_arguments = (ctypes.c_void_p(ctypes.addressof(self._buffer) + _SEQLOCK_OFFSET),
+                                 ctypes.c_void_p(ctypes.addressof(self._buffer) + data_offset),
+                                 (_Copy * len(copies))(*copies),
+                                 ctypes.c_size_t(len(copies)))
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def step(self):
+        """Steps the system and publishes a frame every few steps."""
+        self.system.step()
+        self.steps += 1
+        if self.steps % self.every == 0:
+            self.publish()
+
+    def publish(self):
+        self._library.seqlock_write(*self._write_arguments, ctypes.c_uint64(self.steps))
+
+    def close(self):
+        """Closes and removes the segment, attached readers can still read the last frame."""
+        self._write_arguments = None
+        del self._buffer
+        self._memory.close()
+        self._memory.unlink()
+        _published.discard(self._memory.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Reader:
+    """Attaches to the segment of a publisher by its name and reads its latest frame."""
+    every: int
+    paths: list[str]
+
+    def __init__(self, name: str, attempts: int = 1000000):
+        self._library = _load_library()
+        self._attempts = attempts
+        self._memory = SharedMemory(name=name)
+        if os.name == "posix" and self._memory.name not in _published:
+            # the resource tracker would remove the segment of the publisher when this process exits
+            resource_tracker.unregister(self._memory._name, "shared_memory")
+        magic, version, descriptor_size, data_offset, data_size = struct.unpack_from(_HEADER_FORMAT, self._memory.buf)
+        if magic != _MAGIC or version != _VERSION:
+            self._memory.close()
+            raise Exception(f"{name} is no segment of a publisher")
+        descriptor = json.loads(bytes(self._memory.buf[_HEADER_SIZE:_HEADER_SIZE + descriptor_size]))
+        self.every = descriptor["every"]
+        self.paths = [field["path"] for field in descriptor["fields"]]
+        self._fields = [(field["path"], struct.Struct(f"{math.prod(field['shape'])}{field['format']}"),
+                         field["offset"], field["shape"]) for field in descriptor["fields"]]
+        self._buffer = (ctypes.c_char * (data_offset + data_size)).from_buffer(self._memory.buf)
+        self._header = ctypes.addressof(self._buffer) + _SEQLOCK_OFFSET
+        self._data = ctypes.addressof(self._buffer) + data_offset
+        self._frame = ctypes.create_string_buffer(data_size)
+        self._step = ctypes.c_uint64()
+
+    def read(self) -> Optional[Frame]:
+        """Returns the latest frame or None, if nothing was published yet."""
+        sequence = self._library.seqlock_read(self._header, self._data, self._frame, len(self._frame),
+                                              ctypes.byref(self._step), self._attempts)
+        if sequence == 0:
+            return None
+        if sequence % 2 == 1:
+            raise Exception("No complete frame was read, the publisher may have stopped while writing")
+        return Frame(sequence=sequence // 2,
+                     step=self._step.value,
+                     values={path: _shaped(layout.unpack_from(self._frame, offset), shape)
+                             for path, layout, offset, shape in self._fields})
+
+    def close(self):
+        del self._buffer
+        self._memory.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
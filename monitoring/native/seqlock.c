@@ -0,0 +1,71 @@
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+#ifdef _WIN32
+#include <windows.h>
+#define yield() SwitchToThread()
+#else
+#include <sched.h>
+#define yield() sched_yield()
+#endif
+
+typedef struct {
+    uint64_t sequence;
+    uint64_t step;
+} seqlock_header;
+
+typedef struct {
+    const void *source;
+    size_t destination;
+    size_t size;
+} seqlock_copy;
+
+/*
+ * Copies the values into the data of the frame. The sequence is odd while the frame is written, so readers can tell
+ * a frame they read while it was written apart from a complete one.
+ */
+void seqlock_write(
+        seqlock_header *header,
+        unsigned char *data,
+        const seqlock_copy *copies,
+        size_t copy_count,
+        uint64_t step
+) {
+    uint64_t sequence = __atomic_load_n(&header->sequence, __ATOMIC_RELAXED);
+    __atomic_store_n(&header->sequence, sequence + 1, __ATOMIC_RELAXED);
+    __atomic_thread_fence(__ATOMIC_RELEASE);
+    for (size_t copy = 0; copy < copy_count; copy++) {
+        memcpy(data + copies[copy].destination, copies[copy].source, copies[copy].size);
+    }
+    __atomic_store_n(&header->step, step, __ATOMIC_RELAXED);
+    __atomic_store_n(&header->sequence, sequence + 2, __ATOMIC_RELEASE);
+}
+
+/*
+ * Copies the data of the latest complete frame to the destination and returns its sequence, which is 0 if nothing
+ * was written yet. Returns 1, an odd sequence, if no complete frame was read within the given attempts.
+ */
+uint64_t seqlock_read(
+        const seqlock_header *header,
+        const unsigned char *data,
+        unsigned char *destination,
+        size_t size,
+        uint64_t *step,
+        uint64_t attempts
+) {
+    for (uint64_t attempt = 0; attempt < attempts; attempt++) {
+        uint64_t before = __atomic_load_n(&header->sequence, __ATOMIC_ACQUIRE);
+        if (before & 1) {
+            /* the publisher may have been preempted while writing, so it needs the CPU to finish */
+            yield();
+            continue;
+        }
+        memcpy(destination, data, size);
+        *step = __atomic_load_n(&header->step, __ATOMIC_RELAXED);
+        __atomic_thread_fence(__ATOMIC_ACQUIRE);
+        if (__atomic_load_n(&header->sequence, __ATOMIC_RELAXED) == before) {
+            return before;
+        }
+    }
+    return 1;
+}
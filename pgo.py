@@ -0,0 +1,225 @@
+import argparse
+import glob
+import importlib
+import json
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from librarycompiler.SimulinkModelCompiler import SimulinkModelCompiler
+from librarycompiler.buildcache import BuildCache
+from librarycompiler.buildprofile import BuildProfile, BUILD_PROFILES, RELEASE
+from main import PathAction, dir_path, header_file, generate_bindings
+
+_INSTRUMENTED_PROFILE_NAME = "pgo-generate"
+_OPTIMIZED_PROFILE_NAME = "pgo"
+_CLANG_PROFILE_DATA = "merged.profdata"
+
+
+@dataclass(frozen=True)
+class PgoResult:
+    baseline_steps_per_second: float
+    optimized_steps_per_second: float
+
+
+def load_trajectory(file: str) -> list[dict[str, Any]]:
+    """
+    Loads a JSON list with the inputs of every step, e.g. [{"In1": 1.0, "Bus": {"a": [1, 2]}}, ...].
+    Inputs that are not given keep their value of the previous step.
+    """
+    with open(file) as source:
+        trajectory = json.load(source)
+    if not isinstance(trajectory, list) or not all(isinstance(step, dict) for step in trajectory):
+        raise Exception(f"{file} must contain a list with the inputs of every step")
+    if len(trajectory) == 0:
+        raise Exception(f"{file} does not contain any step")
+    return trajectory
+
+
+def _assign(target, values: dict[str, Any]):
+    for name, value in values.items():
+        if isinstance(value, dict):
+            _assign(getattr(target, name), value)
+        elif isinstance(value, list):
+            _assign_array(getattr(target, name), value)
+        else:
+            setattr(target, name, value)
+
+
+def _assign_array(array, values: list[Any]):
+    for index, value in enumerate(values):
+        if isinstance(value, dict):
+            _assign(array[index], value)
+        elif isinstance(value, list):
+            _assign_array(array[index], value)
+        else:
+            array[index] = value
+
+
+def _load_system(output_path: str, bindings_name: str, build_profile: str):
+    sys.path.insert(0, output_path)
+    try:
+        module = importlib.import_module(bindings_name.lower())
+    finally:
+        sys.path.remove(output_path)
+    return getattr(module, bindings_name)(build_profile=build_profile)
+
+
+def replay(output_path: str, bindings_name: str, build_profile: str, trajectory: list[dict[str, Any]],
+           repetitions: int) -> float:
+    """Steps the system with the inputs of the trajectory and returns the steps per second."""
+    system = _load_system(output_path, bindings_name, build_profile)
+    system.initialize()
+    inputs = system.inputs
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        for values in trajectory:
+            _assign(inputs, values)
+            system.step()
+    duration = time.perf_counter() - start
+    system.terminate()
+    return repetitions * len(trajectory) / duration
+
+
+def train(output_path: str, bindings_name: str, trajectory_file: str, repetitions: str):
+    replay(output_path, bindings_name, _INSTRUMENTED_PROFILE_NAME, load_trajectory(trajectory_file), int(repetitions))
+
+
+def _train_in_subprocess(output_path: str, bindings_name: str, trajectory_file: str, repetitions: int):
+    # the instrumented library writes its profile when the process exits
+    subprocess.run([sys.executable, "-c", "import sys, pgo; pgo.train(*sys.argv[1:])",
+                    output_path, bindings_name, trajectory_file, str(repetitions)],
+                   cwd=os.path.dirname(os.path.abspath(__file__)),
+                   check=True)
+
+
+def _is_clang(compiler: str) -> bool:
+    result = subprocess.run(f"{compiler} --version", shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            text=True)
+    return "clang" in result.stdout
+
+
+def _instrumented_profile(base_profile: BuildProfile, profile_directory: str, clang: bool) -> BuildProfile:
+    # gcc writes the .gcda files next to the objects, clang writes .profraw files to the profile directory
+    flag = f"-fprofile-generate={profile_directory}" if clang else "-fprofile-generate"
+    return BuildProfile(name=_INSTRUMENTED_PROFILE_NAME,
+                        cflags=f"{base_profile.cflags} {flag}",
+                        suffix=f"_{_INSTRUMENTED_PROFILE_NAME}")
+
+
+def _optimized_profile(base_profile: BuildProfile, profile_directory: str, clang: bool) -> BuildProfile:
+    if clang:
+        flags = f"-fprofile-use={os.path.join(profile_directory, _CLANG_PROFILE_DATA)}"
+    else:
+        flags = "-fprofile-use -fprofile-partial-training -Wno-missing-profile"
+    return BuildProfile(name=_OPTIMIZED_PROFILE_NAME,
+                        cflags=f"{base_profile.cflags} {flags}",
+                        suffix=f"_{_OPTIMIZED_PROFILE_NAME}")
+
+
+def _merge_profiles(profile_directory: str, instrumented_build_directory: str, optimized_build_directory: str,
+                    clang: bool):
+    if clang:
+        profdata = shutil.which("llvm-profdata")
+        command = [profdata] if profdata is not None else ["xcrun", "llvm-profdata"]
+        subprocess.run(command + ["merge", f"-output={os.path.join(profile_directory, _CLANG_PROFILE_DATA)}"] +
+                       glob.glob(os.path.join(profile_directory, "*.profraw")),
+                       check=True)
+    else:
+        # gcc merges the runs itself, the profile of every object only has to be placed next to the optimized object
+        os.makedirs(optimized_build_directory, exist_ok=True)
+        for file in glob.glob(os.path.join(instrumented_build_directory, "*.gcda")):
+            shutil.copyfile(file, os.path.join(optimized_build_directory, os.path.basename(file)))
+
+
+def optimize(
+        header: str,
+        output_path: str,
+        binary_name: str,
+        bindings_name: str,
+        trajectory_file: str,
+        repetitions: int = 1,
+        base_profile: BuildProfile = RELEASE,
+        cache: bool = True
+) -> PgoResult:
+    """
+    Builds the model with the base profile, trains an instrumented build with the trajectory and builds the
+    profile guided optimized binary, which the bindings load with build_profile="pgo".
+    """
+    source_path = str(Path(header).parent)
+    trajectory = load_trajectory(trajectory_file)
+    compiler = SimulinkModelCompiler(profile=base_profile, cache=BuildCache() if cache else None)
+    platform = compiler.native_platform()
+    if platform is None:
+        raise Exception("Profile guided optimization needs a native build for the platform of the host")
+    clang = _is_clang(compiler.native_compiler_for_platform(platform))
+
+    generate_bindings(header, output_path, bindings_name, binary_name)
+    compiler.compile(source_path, output_path, binary_name, platforms=[platform])
+
+    with tempfile.TemporaryDirectory() as profile_directory:
+        # the build directories are removed, so no object of a previous run or profile is reused
+        instrumented = SimulinkModelCompiler(profile=_instrumented_profile(base_profile, profile_directory, clang))
+        instrumented_build_directory = instrumented.build_directory(source_path, platform)
+        shutil.rmtree(instrumented_build_directory, ignore_errors=True)
+        instrumented.compile(source_path, output_path, binary_name, platforms=[platform])
+        print(f"Training with {trajectory_file}")
+        _train_in_subprocess(output_path, bindings_name, trajectory_file, repetitions)
+
+        optimized = SimulinkModelCompiler(profile=_optimized_profile(base_profile, profile_directory, clang))
+        optimized_build_directory = optimized.build_directory(source_path, platform)
+        shutil.rmtree(optimized_build_directory, ignore_errors=True)
+        _merge_profiles(profile_directory, instrumented_build_directory, optimized_build_directory, clang)
+        optimized.compile(source_path, output_path, binary_name, platforms=[platform])
+
+    for file in glob.glob(os.path.join(output_path, f"{binary_name}_{_INSTRUMENTED_PROFILE_NAME}*")):
+        os.remove(file)
+
+    return PgoResult(
+        baseline_steps_per_second=replay(output_path, bindings_name, base_profile.name, trajectory, repetitions),
+        optimized_steps_per_second=replay(output_path, bindings_name, _OPTIMIZED_PROFILE_NAME, trajectory, repetitions)
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Build a profile guided optimized binary of a model, trained with a representative trajectory.'
+    )
+    parser.add_argument(dest='header', type=header_file, action=PathAction)
+    parser.add_argument(dest='output_path', action='store', type=dir_path)
+    parser.add_argument(dest='trajectory', action=PathAction,
+                        help='JSON file with a list of the inputs of every step')
+    parser.add_argument('-b', '--binary-name', dest='binary_name', action='store', default=None)
+    parser.add_argument('-g', '--generate-bindings', dest='bindings_name', action='store', required=True)
+    parser.add_argument('--repetitions', dest='repetitions', action='store', type=int, default=1,
+                        help='number of times the trajectory is replayed for training and measuring')
+    parser.add_argument('--build-profile', dest='build_profile', action='store', default=RELEASE.name,
+                        choices=list(BUILD_PROFILES.keys()), help='profile whose flags are optimized further')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true', default=False)
+
+    arguments = parser.parse_args(sys.argv[1:])
+
+    binary_name = arguments.binary_name
+    if binary_name is None:
+        binary_name = Path(arguments.header).stem
+
+    result = optimize(arguments.header,
+                      arguments.output_path,
+                      binary_name,
+                      arguments.bindings_name,
+                      arguments.trajectory,
+                      arguments.repetitions,
+                      BUILD_PROFILES[arguments.build_profile],
+                      not arguments.no_cache)
+    speedup = result.optimized_steps_per_second / result.baseline_steps_per_second - 1
+    print()
+    print(f"{'Build':<12} {'Steps/s':>12}")
+    print(f"{arguments.build_profile:<12} {result.baseline_steps_per_second:>12.0f}")
+    print(f"{_OPTIMIZED_PROFILE_NAME:<12} {result.optimized_steps_per_second:>12.0f}  ({speedup:+.1%})")
+    print(f"Load the optimized binary with {arguments.bindings_name}(build_profile=\"{_OPTIMIZED_PROFILE_NAME}\")")
@@ -0,0 +1,104 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, replace
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class StageResult:
+    name: str
+    wall_time: float
+    cpu_time: float
+    # None, if the memory was not traced
+    peak_memory: Optional[int]
+    counters: dict[str, int]
+
+
+class Profiler:
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def count(self, name: str, value: int):
+        pass
+
+
+def _cpu_time() -> float:
+    # includes the time of child processes, like the C preprocessor
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class StageProfiler(Profiler):
+    """
+    Records wall time, cpu time, peak python memory and counters for every stage. cProfile only sees the thread the
+    stage runs in, the work of the threads the writers start shows up as waiting for them.
+    """
+    cprofile_directory: Optional[str] = None
+    # tracing the memory slows down allocation heavy stages considerably, so it distorts the timings
+    trace_memory: bool = False
+    results: list[StageResult]
+    __counters: dict[str, int]
+
+    def __init__(self):
+        self.results = []
+        self.__counters = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        self.__counters = {}
+        profile = None
+        if self.cprofile_directory is not None:
+            profile = cProfile.Profile()
+        if self.trace_memory:
+            tracemalloc.start()
+        wall_time_start = time.perf_counter()
+        cpu_time_start = _cpu_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall_time = time.perf_counter() - wall_time_start
+            cpu_time = _cpu_time() - cpu_time_start
+            peak_memory = None
+            if self.trace_memory:
+                peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            if profile is not None:
+                profile.dump_stats(os.path.join(self.cprofile_directory, f"{name.replace(' ', '_')}.prof"))
+            self.results.append(StageResult(
+                name=name,
+                wall_time=wall_time,
+                cpu_time=cpu_time,
+                peak_memory=peak_memory,
+                counters=self.__counters
+            ))
+
+    def count(self, name: str, value: int):
+        self.__counters[name] = value
+
+    def add_peak_memory(self, traced: "StageProfiler"):
+        """Takes the peak memory of the stages from a separate run, which traced the memory."""
+        peak_memories = {result.name: result.peak_memory for result in traced.results}
+        self.results = [replace(result, peak_memory=peak_memories.get(result.name)) for result in self.results]
+
+    def to_json(self) -> str:
+        return json.dumps({"stages": [asdict(result) for result in self.results]}, indent=2)
+
+    def format(self) -> str:
+        lines = [f"{'Stage':<20} {'Wall time':>10} {'CPU time':>10} {'Peak memory':>12}"]
+        for result in self.results:
+            peak_memory = "-" if result.peak_memory is None else f"{result.peak_memory / 1024 / 1024:.1f}MiB"
+            lines.append(f"{result.name:<20} {result.wall_time:>9.3f}s {result.cpu_time:>9.3f}s {peak_memory:>12}")
+            for counter, value in result.counters.items():
+                lines.append(f"    {counter}: {value}")
+        lines.append(f"{'total':<20} {sum(result.wall_time for result in self.results):>9.3f}s "
+                     f"{sum(result.cpu_time for result in self.results):>9.3f}s")
+        return "\n".join(lines)
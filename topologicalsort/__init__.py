@@ -28,35 +28,105 @@ class TopologicalSorter:
     ignore_names: set[str] = set()
 
     def sort(self, graph: list[Node]) -> SorterResult:
-        sorted_list: list[list[Node]] = []
-        remaining_graph = graph
         eliminated_dependencies = self.ignore_names.copy()
+        dependents: dict[str, list[int]] = {}
+        dependency_counts: list[int] = []
+        independent: list[int] = []
+
+        for index, node in enumerate(graph):
+            open_dependencies = set(self._filter_dependencies(node.dependencies, eliminated_dependencies))
+            for dependency in open_dependencies:
+                dependents.setdefault(dependency, []).append(index)
+            dependency_counts.append(len(open_dependencies))
+            if len(open_dependencies) == 0:
+                independent.append(index)
 
-        while True:
-            independent = [node for node in remaining_graph
-                           if self._get_filtered_dependency_count(node, eliminated_dependencies) == 0]
-            if len(independent) == 0:
-                return CircularDependency(sorted_list, remaining_graph)
-            sorted_list.append(independent)
-            independent_keys = [key for node in independent for key in node.keys]
-            remaining_graph = [node
-                               for node in remaining_graph
-                               if self._get_filtered_dependency_count(node, eliminated_dependencies) > 0]
-            eliminated_dependencies.update(independent_keys)
-
-            if len(remaining_graph) == 0:
-                break
-
+        sorted_list: list[list[Node]] = []
         sorted_count = 0
-        for sub_list in sorted_list:
-            sorted_count += len(sub_list)
+        while len(independent) > 0:
+            sorted_list.append([graph[index] for index in independent])
+            sorted_count += len(independent)
+            newly_independent: list[int] = []
+            for index in independent:
+                for key in graph[index].keys:
+                    if key in eliminated_dependencies:
+                        continue
+                    eliminated_dependencies.add(key)
+                    for dependent in dependents.pop(key, []):
+                        dependency_counts[dependent] -= 1
+                        if dependency_counts[dependent] == 0:
+                            newly_independent.append(dependent)
+            # keep every level in the order of the input graph
+            independent = sorted(newly_independent)
+
+        if len(graph) == 0 or sorted_count < len(graph):
+            return CircularDependency(sorted_list, [node
+                                                    for index, node in enumerate(graph)
+                                                    if dependency_counts[index] > 0])
+
         if len(graph) != sorted_count:
             raise Exception("Something went horribly wrong, we lost some items while sorting them")
 
         return Sorted(sorted_list)
 
-    def _get_filtered_dependency_count(self, node: Node, names_to_be_ignored: set[str]) -> int:
-        return len(self._filter_dependencies(node.dependencies, names_to_be_ignored))
+    def find_circular_dependencies(self, graph: list[Node]) -> list[list[Node]]:
+        """Returns the strongly connected components of the graph that contain a cycle."""
+        providers: dict[str, list[int]] = {}
+        for index, node in enumerate(graph):
+            for key in node.keys:
+                providers.setdefault(key, []).append(index)
+        successors = [sorted({provider
+                              for dependency in self._filter_dependencies(node.dependencies, self.ignore_names)
+                              for provider in providers.get(dependency, [])})
+                      for node in graph]
+
+        # iterative Tarjan, so deep dependency chains do not hit the recursion limit
+        indices = [-1] * len(graph)
+        low_links = [0] * len(graph)
+        on_stack = [False] * len(graph)
+        stack: list[int] = []
+        counter = 0
+        components: list[list[Node]] = []
+        for root in range(len(graph)):
+            if indices[root] != -1:
+                continue
+            indices[root] = low_links[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, 0)]
+            while len(work) > 0:
+                index, successor_position = work[-1]
+                if successor_position < len(successors[index]):
+                    work[-1] = (index, successor_position + 1)
+                    successor = successors[index][successor_position]
+                    if indices[successor] == -1:
+                        indices[successor] = low_links[successor] = counter
+                        counter += 1
+                        stack.append(successor)
+                        on_stack[successor] = True
+                        work.append((successor, 0))
+                    elif on_stack[successor]:
+                        low_links[index] = min(low_links[index], indices[successor])
+                    continue
+
+                work.pop()
+                if len(work) > 0:
+                    parent = work[-1][0]
+                    low_links[parent] = min(low_links[parent], low_links[index])
+                if low_links[index] != indices[index]:
+                    continue
+                component: list[int] = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == index:
+                        break
+                if len(component) > 1 or index in successors[index]:
+                    components.append([graph[member] for member in sorted(component)])
+
+        return components
 
     @staticmethod
     def _filter_dependencies(dependencies: list[str], names_to_be_ignored: set[str]):